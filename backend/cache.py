@@ -1,4 +1,4 @@
-"""Redis cache: sync job status, schema table list, optional chat result cache."""
+"""Redis cache: sync job status, schema table list, optional chat result cache, single-flight locks."""
 from __future__ import annotations
 import json
 from typing import Any
@@ -43,6 +43,18 @@ def _key_chat_cache(connection_key: str, message_hash: str) -> str:
     return f"querypilot:chat:{connection_key}:{message_hash}"
 
 
+def _key_flight_lock(key: str) -> str:
+    return f"querypilot:flight:lock:{key}"
+
+
+def _key_flight_result(key: str, token: str) -> str:
+    return f"querypilot:flight:result:{key}:{token}"
+
+
+def _key_vector_generation(connection_key: str) -> str:
+    return f"querypilot:vector:generation:{connection_key}"
+
+
 # --- Sync job status (Redis or in-memory fallback) ---
 
 def sync_job_set(job_id: str, status: str, result: dict | None = None, error: str | None = None) -> None:
@@ -91,6 +103,32 @@ def schema_tables_get(connection_key: str) -> list[str] | None:
     return None
 
 
+# --- Vector store generation (multi-worker: tells other workers to reload a re-synced index) ---
+
+def vector_generation_set(connection_key: str, generation: int) -> bool:
+    """Publish the latest store generation. Returns False when Redis is unavailable."""
+    r = get_redis()
+    if r:
+        try:
+            r.set(_key_vector_generation(connection_key), generation)
+            return True
+        except Exception:
+            pass
+    return False
+
+
+def vector_generation_get(connection_key: str) -> int | None:
+    r = get_redis()
+    if r:
+        try:
+            raw = r.get(_key_vector_generation(connection_key))
+            if raw is not None:
+                return int(raw)
+        except Exception:
+            pass
+    return None
+
+
 # --- Chat result cache (optional - same question returns cached response) ---
 
 CHAT_CACHE_TTL = 300  # 5 min
@@ -115,3 +153,71 @@ def chat_cache_get(connection_key: str, message_hash: str) -> dict | None:
         except Exception:
             pass
     return None
+
+
+# --- Single-flight (multi-worker: one worker runs an in-flight chat request, others wait) ---
+
+FLIGHT_RESULT_TTL = 30  # long enough for waiting followers to pick the result up
+
+
+def flight_lock_acquire(key: str, token: str, ttl: int) -> bool | None:
+    """Take the lock for key (SET NX with expiry). None when Redis is unavailable."""
+    r = get_redis()
+    if r:
+        try:
+            return bool(r.set(_key_flight_lock(key), token, nx=True, ex=ttl))
+        except Exception:
+            pass
+    return None
+
+
+def flight_lock_owner(key: str) -> str | None:
+    """Token of the current lock holder; None when unlocked or Redis is unavailable."""
+    r = get_redis()
+    if r:
+        try:
+            return r.get(_key_flight_lock(key))
+        except Exception:
+            pass
+    return None
+
+
+# Compare-and-delete in one step: the lock may have expired and been re-taken by another worker
+_RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+def flight_lock_release(key: str, token: str) -> None:
+    """Release the lock if this caller still holds it."""
+    r = get_redis()
+    if r:
+        try:
+            r.eval(_RELEASE_SCRIPT, 1, _key_flight_lock(key), token)
+        except Exception:
+            pass
+
+
+def flight_result_set(key: str, token: str, result: dict) -> None:
+    """Publish the result of the flight led by token."""
+    r = get_redis()
+    if r:
+        try:
+            r.set(_key_flight_result(key, token), json.dumps(result), ex=FLIGHT_RESULT_TTL)
+        except Exception:
+            pass
+
+
+def flight_result_get(key: str, token: str) -> dict | None:
+    r = get_redis()
+    if r:
+        try:
+            raw = r.get(_key_flight_result(key, token))
+            if raw:
+                return json.loads(raw)
+        except Exception:
+            pass
+    return None
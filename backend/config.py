@@ -12,18 +12,139 @@ class Settings(BaseSettings):
     mysql_database: str = "text2sql_db"
     database_type: str = "mysql"  # mysql | postgres
 
+    # Connection pools (one pooled engine per connection, shared across requests)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: int = 30  # seconds to wait for a free connection
+    db_pool_recycle: int = 1800  # seconds; recycle before server-side wait_timeout
+    db_pool_pre_ping: bool = True
+    db_max_engines: int = 32  # LRU cap on cached engines (tenants); evicted engines are disposed
+    db_engine_idle_seconds: int = 1800  # dispose engines unused for this long (0 = never)
+    db_warmup_connections: int = 2  # pooled connections to open for the default .env DB at startup
+    # Startup warm-up (DB pools, embedding model, faiss/LLM client imports):
+    # background = in a worker thread, started at startup; requests are served without waiting for it
+    # (health checks pass at once) | blocking = before the first request | off
+    startup_warmup: str = "background"
+
+    # Schema catalog: in-memory schema per connection; re-extracted on sync or after TTL (0 = never expire)
+    schema_catalog_ttl_seconds: int = 3600
+    # Extraction: bulk = set-based information_schema/pg_catalog queries; inspector = per-table reflection
+    schema_extraction_mode: str = "auto"  # auto (bulk, fall back to inspector) | bulk | inspector
+    # Row counts: estimate = catalog stats (TABLE_ROWS / reltuples); exact = parallel COUNT(*); none = skip
+    row_count_strategy: str = "estimate"
+    row_count_workers: int = 4  # exact: max concurrent COUNT(*) statements
+    row_count_timeout_ms: int = 5000  # exact: per-statement timeout (0 = none)
+
+    # Vector store: directory to persist FAISS indexes (memory-mapped on reload); empty = in-memory only
+    vector_store_dir: str = ""
+    # Multi-worker: all workers share the stores in vector_store_dir and reload when another worker syncs
+    # (generation counter in Redis if configured, else a file next to the index)
+    vector_store_shared: bool = False
+    vector_store_generation_ttl: float = 1.0  # seconds a worker trusts its last generation check (0 = every lookup)
+    # Search index: auto = flat up to vector_index_flat_max chunks, then HNSW (if within the memory
+    # budget) or IVF-PQ, built at sync time. Tune recall vs latency with scripts/ann_recall_report.py
+    vector_index_type: str = "auto"  # auto | flat | hnsw | ivfpq
+    vector_index_flat_max: int = 20000
+    vector_memory_budget_mb: int = 512
+    hnsw_m: int = 32
+    hnsw_ef_construction: int = 80
+    hnsw_ef_search: int = 64
+    ivf_nlist: int = 0  # 0 = 4 * sqrt(n)
+    ivf_nprobe: int = 16
+    pq_m: int = 16  # PQ sub-quantizers (rounded down to a divisor of the embedding dim)
+    ann_rerank_factor: int = 4  # IVF-PQ: re-score k * factor candidates exactly (1 = off)
+
+    # Retrieval: flat = one chunk per table with every column; hierarchical = table summaries pick
+    # candidate tables, then per-column vectors pick only the relevant columns of those tables
+    retrieval_mode: str = "flat"  # flat | hierarchical
+    table_summary_max_columns: int = 30  # hierarchical: column names listed in a table summary
+    hierarchical_max_tables: int = 6
+    hierarchical_columns_per_table: int = 12  # plus key columns, which are always kept
+
+    retrieval_cache_size: int = 1024  # in-process LRU of retrieval results per (store generation, query)
+
+    # Hybrid retrieval: BM25 over table/column identifiers fused with vector scores
+    hybrid_retrieval: bool = True
+    lexical_weight: float = 0.3  # fused = (1 - w) * cosine + w * normalized BM25
+    lexical_fast_path: bool = True  # skip the query embedding when identifiers match confidently (flat mode only)
+    lexical_fast_path_coverage: float = 1.0  # share of content words that must be schema identifiers
+    lexical_min_score: float = 0.5  # fast path: keep hits scoring at least this share of the top BM25 hit
+
+    # FK join-path expansion: add the bridging tables needed to join the top retrieved tables
+    join_expansion: bool = True
+    join_expand_tables: int = 4  # top retrieved tables to connect
+    join_max_hops: int = 3
+
+    # Prompt context packing: score cutoff, per-table merge, hard token budget (~4 chars/token)
+    context_packing: bool = True
+    context_token_budget: int = 2000  # 0 = no budget
+    context_min_score: float = 0.2  # cosine similarity floor
+    context_score_gap: float = 0.15  # stop at the first score drop larger than this
+    context_min_chunks: int = 2  # always kept, regardless of score
+
     # OpenAI (optional if using Ollama + HuggingFace)
     openai_api_key: str = ""
 
-    # Embeddings: openai | huggingface (huggingface = local, no API key)
+    # Embeddings: openai | huggingface | onnx (huggingface/onnx = local, no API key; onnx = ONNX Runtime, no torch)
     embedding_provider: str = "huggingface"
     embedding_model: str = "all-MiniLM-L6-v2"  # HF model when provider=huggingface; OpenAI name when openai
+    preload_embedding_model: bool = True  # load the local model at startup instead of on first request
+    # Embedding cache keyed by (model, sha256(text)): memory LRU, plus SQLite on disk when a dir is set
+    embedding_cache_enabled: bool = True
+    embedding_cache_dir: str = ""
+    embedding_cache_size: int = 10000  # in-memory entries
+    embedding_batch_size: int = 64  # HuggingFace encode() batch size
+    openai_embedding_concurrency: int = 4  # parallel OpenAI embedding requests on large syncs
+    # ONNX Runtime backend (embedding_provider=onnx): exported once into onnx_cache_dir
+    onnx_cache_dir: str = "~/.cache/querypilot/onnx"
+    onnx_quantize: bool = False  # int8 dynamic quantization (faster, smaller; check parity first)
+    onnx_max_seq_length: int = 256
+    onnx_threads: int = 0  # intra-op threads; 0 = onnxruntime default
+    # Micro-batching: small local embed calls from concurrent requests are encoded as one batch
+    embedding_microbatch: bool = True
+    embedding_microbatch_wait_ms: float = 5.0  # how long the worker gathers requests after the first
+    embedding_microbatch_max_items: int = 64  # texts per batch; larger calls bypass the batcher
 
     # LLM: openai | ollama | groq (groq = cloud, no local server)
     llm_provider: str = "groq"
     llm_model: str = "llama-3.1-8b-instant"  # used when provider=groq; override for openai/ollama
     ollama_base_url: str = "http://localhost:11434"
     groq_api_key: str = ""
+    openai_base_url: str = ""  # OpenAI-compatible endpoint (proxy/gateway); empty = api.openai.com
+    # Shared LLM HTTP clients: one keep-alive connection pool per process (sync + async)
+    llm_max_connections: int = 20
+    llm_max_keepalive_connections: int = 10
+    llm_keepalive_expiry: float = 60.0  # seconds an idle connection is kept open
+    llm_http2: bool = False  # needs httpx[http2]; ignored if h2 is not installed
+    llm_timeout: float = 120.0
+    llm_connect_timeout: float = 10.0
+    llm_max_retries: int = 2
+
+    # Chat pipeline: concurrent = retrieve on the raw question while the intent LLM call runs | serial
+    pipeline_mode: str = "concurrent"
+    # Intent: local = keyword/schema classifier, LLM only below the threshold | llm | skip (no intent step)
+    intent_mode: str = "local"
+    local_intent_threshold: float = 0.75  # share of content words explained by schema identifiers / enum values
+    local_intent_vector_threshold: float = 0.5  # fallback: cosine to the best table chunk that counts as confident
+    pipeline_workers: int = 0  # threads for intent calls running alongside retrieval; 0 = one per request thread
+
+    # Semantic NL -> SQL cache: paraphrases of an earlier question (per connection) reuse its SQL.
+    # Entries are dropped when that connection's schema is re-synced.
+    semantic_cache: bool = True
+    semantic_cache_threshold: float = 0.95  # cosine between question embeddings
+    semantic_cache_size: int = 1000  # entries per connection; oldest evicted first
+    semantic_cache_audit_rate: float = 0.05  # share of hits regenerated in the background to catch false hits
+    # SQL templates: questions differing only in constants (numbers, dates, quoted/enum values) reuse
+    # one validated parameterized SQL with the new values bound
+    template_cache: bool = True
+    template_cache_size: int = 2048
+
+    # Coalesce identical in-flight chat requests (same connection, message, include_summary): one runs,
+    # the others wait for its result. Across workers via a Redis lock key when Redis is configured.
+    chat_coalescing: bool = True
+    chat_coalesce_timeout: float = 30.0  # seconds a follower waits before running the request itself
+    chat_coalesce_lock_ttl: int = 60  # seconds; frees the lock if the leading worker dies
+    chat_coalesce_poll_ms: float = 100.0  # followers in other workers poll for the result
 
     # Safety
     max_rows_limit: int = 1000
@@ -0,0 +1,117 @@
+"""Process-wide SQLAlchemy engine registry: one pooled engine per connection, reused across requests."""
+from __future__ import annotations
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from config import get_settings
+from connection import ConnectionConfig, get_connection
+
+# registry key -> (engine, last_used monotonic time); most recently used last
+_engines: OrderedDict[str, tuple[Engine, float]] = OrderedDict()
+_lock = threading.Lock()
+
+
+def _registry_key(conn: ConnectionConfig) -> str:
+    """connection_key() plus a password fingerprint, so a changed password gets a fresh pool."""
+    pw = hashlib.sha256(conn.password.encode()).hexdigest()[:12]
+    return f"{conn.connection_key()}:{conn.database_type}:{pw}"
+
+
+def _create(conn: ConnectionConfig) -> Engine:
+    s = get_settings()
+    return create_engine(
+        conn.sqlalchemy_url(),
+        pool_size=s.db_pool_size,
+        max_overflow=s.db_max_overflow,
+        pool_timeout=s.db_pool_timeout,
+        pool_recycle=s.db_pool_recycle,
+        pool_pre_ping=s.db_pool_pre_ping,
+    )
+
+
+def _evict_locked(now: float) -> list[Engine]:
+    """Drop idle and over-capacity engines (caller holds _lock). Returns engines to dispose."""
+    s = get_settings()
+    evicted: list[Engine] = []
+    if s.db_engine_idle_seconds > 0:
+        for key in [k for k, (_, used) in _engines.items() if now - used > s.db_engine_idle_seconds]:
+            evicted.append(_engines.pop(key)[0])
+    while len(_engines) > max(1, s.db_max_engines):
+        _, (engine, _) = _engines.popitem(last=False)
+        evicted.append(engine)
+    return evicted
+
+
+def get_engine(connection_config: ConnectionConfig | None = None) -> Engine:
+    """Return the shared pooled engine for this connection (None = env/default)."""
+    conn = get_connection(connection_config)
+    key = _registry_key(conn)
+    now = time.monotonic()
+    with _lock:
+        entry = _engines.get(key)
+        if entry is None:
+            engine = _create(conn)
+        else:
+            engine = entry[0]
+        _engines[key] = (engine, now)
+        _engines.move_to_end(key)
+        evicted = _evict_locked(now)
+    for old in evicted:
+        old.dispose()
+    return engine
+
+
+def dispose_engine(connection_config: ConnectionConfig | None = None) -> bool:
+    """Close the pool for one connection. Returns True if an engine was cached."""
+    key = _registry_key(get_connection(connection_config))
+    with _lock:
+        entry = _engines.pop(key, None)
+    if entry is None:
+        return False
+    entry[0].dispose()
+    return True
+
+
+def dispose_all() -> None:
+    """Close every cached pool (app shutdown)."""
+    with _lock:
+        engines = [e for e, _ in _engines.values()]
+        _engines.clear()
+    for engine in engines:
+        engine.dispose()
+
+
+def warm_up(connection_config: ConnectionConfig | None = None, connections: int | None = None) -> int:
+    """Open up to `connections` pooled connections so the first requests skip the handshake.
+
+    Returns the number of connections opened; errors (e.g. DB unreachable) are swallowed.
+    """
+    n = get_settings().db_warmup_connections if connections is None else connections
+    if n <= 0:
+        return 0
+    engine = get_engine(connection_config)
+    opened = []
+    try:
+        for _ in range(n):
+            c = engine.connect()
+            opened.append(c)
+            c.execute(text("SELECT 1"))
+    except Exception:
+        pass
+    finally:
+        for c in opened:
+            c.close()  # returns the connection to the pool, keeps it open
+    return len(opened)
+
+
+def pool_stats() -> list[dict]:
+    """Per-engine pool status for diagnostics."""
+    with _lock:
+        items = list(_engines.items())
+    return [
+        {"key": key.split(":")[0], "dialect": key.split(":")[1], "status": engine.pool.status()}
+        for key, (engine, _) in items
+    ]
@@ -1,5 +1,10 @@
 """RAG-based evaluation using RAGAS: faithfulness, relevancy, context precision/recall, execution accuracy."""
-from .ragas_metrics import RAGASEvaluator
-from .benchmark import BenchmarkRunner
+from lazy import lazy_exports
 
-__all__ = ["RAGASEvaluator", "BenchmarkRunner"]
+__getattr__, __all__ = lazy_exports(
+    __name__,
+    {
+        "RAGASEvaluator": ".ragas_metrics",
+        "BenchmarkRunner": ".benchmark",
+    },
+)
@@ -23,6 +23,9 @@ class BenchmarkRunner:
         precision = [r.context_precision for r in results if r.context_precision is not None]
         recall = [r.context_recall for r in results if r.context_recall is not None]
         exec_acc = [r.execution_accuracy for r in results if r.execution_accuracy is not None]
+        ctx_tokens = [r.context_tokens for r in results if r.context_tokens is not None]
+        with_intent = [r for r in results if r.intent_source is not None]
+        local_correct = [r.local_intent_correct for r in results if r.local_intent_correct is not None]
 
         return {
             "n": n,
@@ -31,6 +34,13 @@ class BenchmarkRunner:
             "context_precision_avg": sum(precision) / len(precision) if precision else 0,
             "context_recall_avg": sum(recall) / len(recall) if recall else 0,
             "execution_accuracy_avg": sum(exec_acc) / len(exec_acc) if exec_acc else 0,
+            "context_tokens_avg": sum(ctx_tokens) / len(ctx_tokens) if ctx_tokens else 0,
+            # Share of questions answered by the local classifier (no intent LLM call), and the accuracy
+            # of those answers against expected_intent
+            "intent_fast_path_rate": (
+                sum(1 for r in with_intent if r.intent_source == "local") / len(with_intent) if with_intent else 0
+            ),
+            "local_intent_accuracy": sum(local_correct) / len(local_correct) if local_correct else 0,
             "results": [
                 {
                     "question": r.question,
@@ -41,6 +51,11 @@ class BenchmarkRunner:
                     "context_precision": r.context_precision,
                     "context_recall": r.context_recall,
                     "execution_accuracy": r.execution_accuracy,
+                    "context_tokens": r.context_tokens,
+                    "intent_source": r.intent_source,
+                    "local_intent": r.local_intent,
+                    "local_intent_confidence": r.local_intent_confidence,
+                    "local_intent_correct": r.local_intent_correct,
                     "error": r.error,
                 }
                 for r in results
@@ -10,6 +10,7 @@ class BenchmarkItem:
     expected_sql: str | None  # optional gold SQL
     expected_output_sample: list[dict[str, Any]] | None  # optional gold result sample
     expected_row_count: int | None  # optional expected count
+    expected_intent: str | None = None  # optional: SELECT | aggregation | filter | join (scores the local classifier)
 
 
 # Example benchmark set; extend with your own DB schema-specific questions.
@@ -19,18 +20,21 @@ DEFAULT_BENCHMARK: list[BenchmarkItem] = [
         expected_sql="SELECT COUNT(*) FROM users",
         expected_output_sample=None,
         expected_row_count=1,
+        expected_intent="aggregation",
     ),
     BenchmarkItem(
         question="List the first 10 orders",
         expected_sql="SELECT * FROM orders LIMIT 10",
         expected_output_sample=None,
         expected_row_count=10,
+        expected_intent="SELECT",
     ),
     BenchmarkItem(
         question="What are the names of all products?",
         expected_sql="SELECT name FROM products",
         expected_output_sample=None,
         expected_row_count=None,
+        expected_intent="SELECT",
     ),
 ]
 
@@ -21,6 +21,11 @@ class EvaluationResult:
     context_recall: float | None
     execution_accuracy: float | None  # 1.0 if result matches gold
     error: str | None
+    context_tokens: int | None = None  # prompt schema-context size, to compare packing settings
+    intent_source: str | None = None  # llm | local | skip (local = answered without an LLM call)
+    local_intent: str | None = None  # set when the local classifier answered (intent_source == "local")
+    local_intent_confidence: float | None = None
+    local_intent_correct: float | None = None  # local answer vs expected_intent
 
 
 class RAGASEvaluator:
@@ -94,6 +99,7 @@ class RAGASEvaluator:
         expected_tables: list[str] | None = None,
         expected_row_count: int | None = None,
         expected_output_sample: list[dict] | None = None,
+        expected_intent: str | None = None,
     ) -> EvaluationResult:
         """Run pipeline for one question and compute metrics."""
         # Generate SQL + get context
@@ -104,7 +110,11 @@ class RAGASEvaluator:
         retrieved_texts = [r.get("text", "") for r in retrieved]
 
         # Execution
-        rows, exec_err = self.runner.execute(generated_sql) if out["valid"] else ([], "Invalid SQL")
+        rows, exec_err = (
+            self.runner.execute(out.get("sql_template", generated_sql), out.get("params"))
+            if out["valid"]
+            else ([], "Invalid SQL")
+        )
         execution_success = out["valid"] and exec_err is None
         row_count = len(rows) if rows else 0
 
@@ -118,6 +128,13 @@ class RAGASEvaluator:
             rows, expected_row_count, expected_output_sample
         ) if execution_success else 0.0
 
+        # Intents answered by the local classifier (no LLM call) vs the gold label
+        intent = out.get("intent") or {}
+        local = intent if intent.get("source") == "local" else {}
+        local_correct = None
+        if local and expected_intent:
+            local_correct = 1.0 if local["intent"].lower() == expected_intent.lower() else 0.0
+
         return EvaluationResult(
             question=question,
             generated_sql=generated_sql,
@@ -130,6 +147,11 @@ class RAGASEvaluator:
             context_recall=context_recall,
             execution_accuracy=execution_accuracy,
             error=out.get("error") or exec_err,
+            context_tokens=out.get("context_tokens"),
+            intent_source=intent.get("source"),
+            local_intent=local.get("intent"),
+            local_intent_confidence=local.get("confidence"),
+            local_intent_correct=local_correct,
         )
 
     def evaluate_benchmark(self, items: list[Any]) -> list[EvaluationResult]:
@@ -145,6 +167,7 @@ class RAGASEvaluator:
                 expected_tables=expected_tables,
                 expected_row_count=getattr(item, "expected_row_count", None),
                 expected_output_sample=getattr(item, "expected_output_sample", None),
+                expected_intent=getattr(item, "expected_intent", None),
             )
             results.append(r)
         return results
@@ -1,9 +1,10 @@
 """Execute validated SQL on MySQL/Postgres and fetch results."""
 from __future__ import annotations
 from typing import Any
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from sqlalchemy.engine import Engine
 from connection import get_connection, ConnectionConfig
+from engines import get_engine
 
 
 class QueryRunner:
@@ -15,15 +16,18 @@ class QueryRunner:
 
     def _get_engine(self) -> Engine:
         if self._engine is None:
-            self._engine = create_engine(self.conn.sqlalchemy_url())
+            self._engine = get_engine(self.conn)
         return self._engine
 
-    def execute(self, sql: str) -> tuple[list[dict[str, Any]], str | None]:
-        """Run SQL; return (list of row dicts, error_message). error_message is None on success."""
+    def execute(self, sql: str, params: dict[str, Any] | None = None) -> tuple[list[dict[str, Any]], str | None]:
+        """Run SQL with optional :name bind params; return (list of row dicts, error_message).
+
+        error_message is None on success.
+        """
         try:
             engine = self._get_engine()
             with engine.connect() as conn:
-                result = conn.execute(text(sql))
+                result = conn.execute(text(sql), params or {})
                 rows = [dict(row._mapping) for row in result]
                 # Coerce non-JSON-serializable types
                 for row in rows:
@@ -0,0 +1,45 @@
+"""Deferred imports for heavy optional libraries (faiss, openai, ...): imported on first attribute access."""
+from __future__ import annotations
+import importlib
+from types import ModuleType
+
+
+class LazyModule:
+    """Stand-in for a module; the real import happens the first time an attribute is read."""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module: ModuleType | None = None
+
+    def _load(self) -> ModuleType:
+        if self._module is None:
+            self._module = importlib.import_module(self._name)  # the import lock makes this thread-safe
+        return self._module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    return LazyModule(name)
+
+
+def lazy_exports(package: str, exports: dict[str, str]):
+    """(__getattr__, __all__) for a package whose exports are imported on first access (PEP 562).
+
+    exports maps a name to the relative submodule defining it, so importing one submodule does not
+    load its siblings and their dependencies. Usage in __init__.py:
+
+        __getattr__, __all__ = lazy_exports(__name__, {"Name": ".module"})
+    """
+
+    def __getattr__(name: str):
+        if name in exports:
+            return getattr(importlib.import_module(exports[name], package), name)
+        raise AttributeError(f"module {package!r} has no attribute {name!r}")
+
+    return __getattr__, list(exports)
@@ -1,4 +1,4 @@
 """Unified LLM interface: OpenAI or Ollama (open-source, local)."""
-from .chat import chat_completion
+from .chat import chat_completion, chat_completion_async
 
-__all__ = ["chat_completion"]
+__all__ = ["chat_completion", "chat_completion_async"]
@@ -1,8 +1,14 @@
 """Single function for chat completion: OpenAI, Ollama, or Groq."""
 from __future__ import annotations
-import httpx
-from openai import OpenAI
 from config import get_settings
+from llm.clients import (
+    get_async_groq_client,
+    get_async_http_client,
+    get_async_openai_client,
+    get_groq_client,
+    get_http_client,
+    get_openai_client,
+)
 
 
 def chat_completion(
@@ -29,7 +35,7 @@ def _openai_chat(
     temperature: float = 0,
     max_tokens: int | None = None,
 ) -> str:
-    client = OpenAI(api_key=get_settings().openai_api_key)
+    client = get_openai_client()
     kwargs: dict = {"model": model, "messages": messages, "temperature": temperature}
     if max_tokens is not None:
         kwargs["max_tokens"] = max_tokens
@@ -43,9 +49,7 @@ def _groq_chat(
     temperature: float = 0,
     max_tokens: int | None = None,
 ) -> str:
-    from groq import Groq
-    s = get_settings()
-    client = Groq(api_key=s.groq_api_key)
+    client = get_groq_client()
     kwargs: dict = {"model": model, "messages": messages, "temperature": temperature, "stream": False}
     if max_tokens is not None:
         kwargs["max_completion_tokens"] = max_tokens
@@ -61,8 +65,38 @@ def _ollama_chat(
     base = get_settings().ollama_base_url.rstrip("/")
     url = f"{base}/api/chat"
     payload = {"model": model, "messages": messages, "stream": False, "options": {"temperature": temperature}}
-    with httpx.Client(timeout=120.0) as client:
-        resp = client.post(url, json=payload)
-        resp.raise_for_status()
+    resp = get_http_client().post(url, json=payload)
+    resp.raise_for_status()
     data = resp.json()
-    return (data.get("message") or {}).get("content") or ""
\ No newline at end of file
+    return (data.get("message") or {}).get("content") or ""
+
+
+async def chat_completion_async(
+    messages: list[dict[str, str]],
+    model: str | None = None,
+    temperature: float = 0,
+    max_tokens: int | None = None,
+) -> str:
+    """Async chat_completion on the shared async clients (same providers and arguments)."""
+    settings = get_settings()
+    provider = getattr(settings, "llm_provider", "openai")
+    model = model or settings.llm_model
+
+    if provider == "ollama":
+        base = settings.ollama_base_url.rstrip("/")
+        payload = {"model": model, "messages": messages, "stream": False, "options": {"temperature": temperature}}
+        resp = await get_async_http_client().post(f"{base}/api/chat", json=payload)
+        resp.raise_for_status()
+        return (resp.json().get("message") or {}).get("content") or ""
+    kwargs: dict = {"model": model, "messages": messages, "temperature": temperature}
+    if provider == "groq":
+        client = get_async_groq_client()
+        kwargs["stream"] = False
+        if max_tokens is not None:
+            kwargs["max_completion_tokens"] = max_tokens
+    else:
+        client = get_async_openai_client()
+        if max_tokens is not None:
+            kwargs["max_tokens"] = max_tokens
+    resp = await client.chat.completions.create(**kwargs)
+    return (resp.choices[0].message.content or "").strip()
\ No newline at end of file
@@ -0,0 +1,113 @@
+"""Process-wide LLM / embedding API clients sharing pooled keep-alive HTTP connections.
+
+One sync and one async httpx client (connection limits, keep-alive, optional HTTP/2) back every
+OpenAI, Groq and Ollama call, so the intent, SQL and summary calls of a chat request reuse
+connections instead of opening new ones. SDK clients are created on first use.
+"""
+from __future__ import annotations
+import threading
+from typing import Any
+import httpx
+from config import get_settings
+
+_clients: dict[str, Any] = {}
+_lock = threading.RLock()  # SDK client factories create the shared httpx client under it
+
+
+def _http2() -> bool:
+    if not get_settings().llm_http2:
+        return False
+    try:
+        import h2  # noqa: F401  (httpx needs it for HTTP/2: pip install 'httpx[http2]')
+    except ImportError:
+        return False
+    return True
+
+
+def _limits() -> httpx.Limits:
+    s = get_settings()
+    return httpx.Limits(
+        max_connections=s.llm_max_connections,
+        max_keepalive_connections=s.llm_max_keepalive_connections,
+        keepalive_expiry=s.llm_keepalive_expiry,
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    s = get_settings()
+    return httpx.Timeout(s.llm_timeout, connect=s.llm_connect_timeout)
+
+
+def _get(name: str, factory) -> Any:
+    client = _clients.get(name)
+    if client is not None:
+        return client
+    with _lock:
+        client = _clients.get(name)
+        if client is None:
+            client = factory()
+            _clients[name] = client
+    return client
+
+
+def get_http_client() -> httpx.Client:
+    """Shared pooled httpx client (also the transport of the sync SDK clients)."""
+    return _get("http", lambda: httpx.Client(limits=_limits(), timeout=_timeout(), http2=_http2()))
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Shared pooled httpx async client. Use from one event loop (the app's)."""
+    return _get("http_async", lambda: httpx.AsyncClient(limits=_limits(), timeout=_timeout(), http2=_http2()))
+
+
+def _openai_kwargs() -> dict:
+    s = get_settings()
+    kwargs: dict = {"api_key": s.openai_api_key, "max_retries": s.llm_max_retries}
+    if s.openai_base_url:
+        kwargs["base_url"] = s.openai_base_url
+    return kwargs
+
+
+def get_openai_client():
+    def make():
+        from openai import OpenAI
+        return OpenAI(http_client=get_http_client(), **_openai_kwargs())
+
+    return _get("openai", make)
+
+
+def get_async_openai_client():
+    def make():
+        from openai import AsyncOpenAI
+        return AsyncOpenAI(http_client=get_async_http_client(), **_openai_kwargs())
+
+    return _get("openai_async", make)
+
+
+def get_groq_client():
+    def make():
+        from groq import Groq
+        s = get_settings()
+        return Groq(api_key=s.groq_api_key, max_retries=s.llm_max_retries, http_client=get_http_client())
+
+    return _get("groq", make)
+
+
+def get_async_groq_client():
+    def make():
+        from groq import AsyncGroq
+        s = get_settings()
+        return AsyncGroq(api_key=s.groq_api_key, max_retries=s.llm_max_retries, http_client=get_async_http_client())
+
+    return _get("groq_async", make)
+
+
+async def close_clients() -> None:
+    """Close pooled connections (app shutdown). Clients are re-created on next use."""
+    with _lock:
+        clients = dict(_clients)
+        _clients.clear()
+    if "http" in clients:
+        clients["http"].close()
+    if "http_async" in clients:
+        await clients["http_async"].aclose()
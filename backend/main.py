@@ -1,21 +1,88 @@
 """QueryPilot API."""
 from __future__ import annotations
+import asyncio
+import anyio.to_thread
 import hashlib
+import importlib
+import time
 import uuid
+from contextlib import asynccontextmanager
 from fastapi import BackgroundTasks, FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Any
 
 from schema_ingestion.pipeline import SchemaIngestionPipeline
-from sql_generation.pipeline import SQLGenerationPipeline
+from sql_generation.pipeline import SQLGenerationPipeline, set_request_concurrency
 from execution.runner import QueryRunner
 from execution.formatter import ResultFormatter
 from config import get_settings
 from connection import connection_from_request, get_connection, ConnectionConfig
 from cache import sync_job_set, sync_job_get, chat_cache_get, chat_cache_set, schema_tables_set, schema_tables_get
-
-app = FastAPI(title="QueryPilot", version="1.0.0")
+from engines import dispose_all, pool_stats, warm_up
+from singleflight import coalesce
+import metrics
+from llm.clients import close_clients
+from schema_ingestion.model_registry import preload_embedding_model
+from schema_ingestion.catalog import get_schema_catalog
+from schema_ingestion.embedding_cache import get_embedding_cache
+from query_understanding.retriever import retrieval_cache_stats
+from schema_ingestion.batcher import batcher_stats
+from sql_generation.semantic_cache import semantic_cache_stats
+from sql_generation.template_cache import template_cache_stats
+
+_warm = False
+
+
+def _warm_up() -> None:
+    """Open the default (.env) pool, load the embedding model and import the libraries requests need.
+
+    Everything here also happens lazily on first use; warming just moves the cost off the first request.
+    """
+    global _warm
+    s = get_settings()
+    try:
+        warm_up()
+    except Exception:
+        pass
+    if s.preload_embedding_model:
+        try:
+            preload_embedding_model()
+        except Exception:
+            pass  # loaded lazily on first use instead
+    modules = ["faiss"]
+    if s.llm_provider == "openai" or s.embedding_provider == "openai":
+        modules.append("openai")
+    if s.llm_provider == "groq":
+        modules.append("groq")
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+    _warm = True
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm up on startup (STARTUP_WARMUP; in the background by default); close all pools on shutdown."""
+    # Sync routes run in anyio's thread pool; size the intent pool to match
+    set_request_concurrency(anyio.to_thread.current_default_thread_limiter().total_tokens)
+    mode = get_settings().startup_warmup
+    task = None
+    if mode == "blocking":
+        await asyncio.to_thread(_warm_up)
+    elif mode == "background":
+        # Starts during lifespan startup, in a worker thread; requests are served without waiting for it
+        task = asyncio.create_task(asyncio.to_thread(_warm_up))
+    yield
+    if task is not None and not task.done():
+        task.cancel()
+    dispose_all()
+    await close_clients()
+
+
+app = FastAPI(title="QueryPilot", version="1.0.0", lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -58,6 +125,7 @@ class ChatResponse(BaseModel):
     summary: str | None
     intent: dict | None = None
     multi_results: list[SingleResult] | None = None  # when user asks for "tables separately"
+    timings: dict[str, float] | None = None  # per-stage milliseconds (intent, retrieval, generation, ...)
 
 
 class SyncSchemaRequest(BaseModel):
@@ -69,6 +137,12 @@ class SyncSchemaResponse(BaseModel):
     tables: int
     chunks: int
     vectors_upserted: int
+    schema_version: int | None = None
+    row_count_strategy: str | None = None
+    chunks_reused: int = 0
+    chunks_deleted: int = 0
+    unchanged: bool = False  # schema fingerprint matched the stored index; nothing was re-embedded
+    join_edges: int = 0  # FK edges in the join graph
 
 
 class SyncSchemaAsyncResponse(BaseModel):
@@ -84,12 +158,29 @@ class EvaluationResponse(BaseModel):
     context_precision_avg: float
     context_recall_avg: float
     execution_accuracy_avg: float
+    context_tokens_avg: float | None = None
+    intent_fast_path_rate: float | None = None
+    local_intent_accuracy: float | None = None
     results: list[dict[str, Any]]
 
 
 @app.get("/health")
 def health():
-    return {"status": "ok"}
+    return {"status": "ok", "warm": _warm}
+
+
+@app.get("/api/stats")
+def stats():
+    """Cache hit rates, per-request counters and pool status for this worker."""
+    return {
+        "embedding_cache": get_embedding_cache().stats(),
+        "retrieval_cache": retrieval_cache_stats(),
+        "semantic_cache": semantic_cache_stats(),
+        "template_cache": template_cache_stats(),
+        "embedding_batcher": batcher_stats(),
+        "counters": metrics.snapshot(),
+        "db_pools": pool_stats(),
+    }
 
 
 def _run_sync_job(job_id: str, connection_config: ConnectionConfig | None) -> None:
@@ -99,10 +190,7 @@ def _run_sync_job(job_id: str, connection_config: ConnectionConfig | None) -> No
         pipeline = SchemaIngestionPipeline(connection_config=connection_config)
         stats = pipeline.run()
         sync_job_set(job_id, "done", result=stats, error=None)
-        from schema_ingestion.extractor import SchemaExtractor
-        ext = SchemaExtractor(connection_config=resolved)
-        schema = ext.extract()
-        schema_tables_set(resolved.connection_key(), [t.name for t in schema.tables])
+        schema_tables_set(resolved.connection_key(), get_schema_catalog().table_names(resolved))
     except Exception as e:
         sync_job_set(job_id, "failed", result=None, error=str(e))
 
@@ -123,10 +211,7 @@ def sync_schema(req: SyncSchemaRequest = SyncSchemaRequest(), background_tasks:
     try:
         pipeline = SchemaIngestionPipeline(connection_config=connection_config)
         stats = pipeline.run()
-        from schema_ingestion.extractor import SchemaExtractor
-        ext = SchemaExtractor(connection_config=resolved_config)
-        schema = ext.extract()
-        schema_tables_set(resolved_config.connection_key(), [t.name for t in schema.tables])
+        schema_tables_set(resolved_config.connection_key(), get_schema_catalog().table_names(resolved_config))
         return SyncSchemaResponse(**stats)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -155,92 +240,120 @@ def chat(req: ChatRequest):
     connection_config = connection_from_request(conn_dict)
     resolved_config = get_connection(connection_config)
     ckey = resolved_config.connection_key()
+    # include_summary changes the response, so it is part of the cache / coalescing key
     msg_hash = hashlib.sha256(req.message.strip().encode()).hexdigest()[:16]
+    if not req.include_summary:
+        msg_hash += ":nosum"
     cached = chat_cache_get(ckey, msg_hash)
     if cached:
         return ChatResponse(**cached)
+    # Identical requests already in flight (this or another worker) share one pipeline run
     try:
-        gen = SQLGenerationPipeline(connection_config=resolved_config)
-        out = gen.run(req.message)
-        if not out["valid"]:
-            return ChatResponse(
-                sql=out["sql"],
-                valid=False,
-                error=out["error"],
-                columns=[],
-                rows=[],
-                row_count=0,
-                summary=None,
-                intent=out.get("intent"),
-            )
-        runner = QueryRunner(connection_config=connection_config)
-
-        # Multiple tables separately (one SELECT per table, no joins)
-        if out.get("sql_list"):
-            multi_results = []
-            errors = []
-            for one_sql in out["sql_list"]:
-                valid_one, err_one = gen.validator.validate(one_sql)
-                if not valid_one:
-                    errors.append(f"{one_sql[:50]}...: {err_one}")
-                    continue
-                rows_one, exec_err = runner.execute(one_sql)
-                if exec_err:
-                    errors.append(f"{one_sql[:50]}...: {exec_err}")
-                    continue
-                cols = list(rows_one[0].keys()) if rows_one else []
-                row_list = [list(r.values()) for r in rows_one]
-                multi_results.append(
-                    SingleResult(sql=one_sql, columns=cols, rows=row_list, row_count=len(rows_one))
-                )
-            summary = f"Returned {len(multi_results)} table(s) separately."
-            if errors:
-                summary += " " + "; ".join(errors[:3])
-            resp = ChatResponse(
-                sql=out["sql"],
-                valid=True,
-                error=None,
-                columns=[],
-                rows=[],
-                row_count=sum(r.row_count for r in multi_results),
-                summary=summary,
-                intent=out.get("intent"),
-                multi_results=multi_results,
-            )
-            chat_cache_set(ckey, msg_hash, resp.model_dump())
-            return resp
-
-        # Single query
-        rows, exec_err = runner.execute(out["sql"])
-        if exec_err:
-            return ChatResponse(
-                sql=out["sql"],
-                valid=True,
-                error=exec_err,
-                columns=[],
-                rows=[],
-                row_count=0,
-                summary=None,
-                intent=out.get("intent"),
-            )
-        formatter = ResultFormatter()
-        formatted = formatter.format(
-            rows, out["sql"], req.message, include_summary=req.include_summary
+        out = coalesce(
+            f"{ckey}:{msg_hash}",
+            lambda: _answer(req, connection_config, resolved_config, ckey, msg_hash).model_dump(),
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return ChatResponse(**out)
+
+
+def _answer(
+    req: ChatRequest,
+    connection_config: ConnectionConfig | None,
+    resolved_config: ConnectionConfig,
+    ckey: str,
+    msg_hash: str,
+) -> ChatResponse:
+    """Run the chat pipeline for a cache miss; caches successful responses."""
+    gen = SQLGenerationPipeline(connection_config=resolved_config)
+    out = gen.run(req.message)
+    if not out["valid"]:
+        return ChatResponse(
+            sql=out["sql"],
+            valid=False,
+            error=out["error"],
+            columns=[],
+            rows=[],
+            row_count=0,
+            summary=None,
+            intent=out.get("intent"),
+            timings=out.get("timings"),
         )
+    runner = QueryRunner(connection_config=connection_config)
+
+    # Multiple tables separately (one SELECT per table, no joins)
+    if out.get("sql_list"):
+        multi_results = []
+        errors = []
+        for one_sql in out["sql_list"]:
+            valid_one, err_one = gen.validator.validate(one_sql)
+            if not valid_one:
+                errors.append(f"{one_sql[:50]}...: {err_one}")
+                continue
+            rows_one, exec_err = runner.execute(one_sql)
+            if exec_err:
+                errors.append(f"{one_sql[:50]}...: {exec_err}")
+                continue
+            cols = list(rows_one[0].keys()) if rows_one else []
+            row_list = [list(r.values()) for r in rows_one]
+            multi_results.append(
+                SingleResult(sql=one_sql, columns=cols, rows=row_list, row_count=len(rows_one))
+            )
+        summary = f"Returned {len(multi_results)} table(s) separately."
+        if errors:
+            summary += " " + "; ".join(errors[:3])
         resp = ChatResponse(
             sql=out["sql"],
             valid=True,
             error=None,
-            columns=formatted["columns"],
-            rows=formatted["rows"],
-            row_count=formatted["row_count"],
-            summary=formatted.get("summary"),
+            columns=[],
+            rows=[],
+            row_count=sum(r.row_count for r in multi_results),
+            summary=summary,
             intent=out.get("intent"),
+            multi_results=multi_results,
+            timings=out.get("timings"),
         )
         chat_cache_set(ckey, msg_hash, resp.model_dump())
         return resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+
+    # Single query
+    timings = out["timings"]
+    t0 = time.perf_counter()
+    rows, exec_err = runner.execute(out.get("sql_template", out["sql"]), out.get("params"))
+    timings["execution_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+    if exec_err:
+        return ChatResponse(
+            sql=out["sql"],
+            valid=True,
+            error=exec_err,
+            columns=[],
+            rows=[],
+            row_count=0,
+            summary=None,
+            intent=out.get("intent"),
+            timings=out.get("timings"),
+        )
+    formatter = ResultFormatter()
+    t0 = time.perf_counter()
+    formatted = formatter.format(
+        rows, out["sql"], req.message, include_summary=req.include_summary
+    )
+    timings["format_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+    resp = ChatResponse(
+        sql=out["sql"],
+        valid=True,
+        error=None,
+        columns=formatted["columns"],
+        rows=formatted["rows"],
+        row_count=formatted["row_count"],
+        summary=formatted.get("summary"),
+        intent=out.get("intent"),
+        timings=out.get("timings"),
+    )
+    chat_cache_set(ckey, msg_hash, resp.model_dump())
+    return resp
 
 
 @app.post("/api/evaluate", response_model=EvaluationResponse)
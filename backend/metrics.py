@@ -0,0 +1,16 @@
+"""In-process counters (per worker) surfaced by GET /api/stats."""
+from __future__ import annotations
+import threading
+
+_counters: dict[str, float] = {}
+_lock = threading.Lock()
+
+
+def incr(name: str, value: float = 1) -> None:
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def snapshot() -> dict[str, float]:
+    with _lock:
+        return dict(_counters)
@@ -1,5 +1,11 @@
 """Phase 2: Query understanding - NL intent, entities, schema retrieval."""
-from .intent import QueryIntent, QueryUnderstanding
-from .retriever import SchemaRetriever
+from lazy import lazy_exports
 
-__all__ = ["QueryIntent", "QueryUnderstanding", "SchemaRetriever"]
+__getattr__, __all__ = lazy_exports(
+    __name__,
+    {
+        "QueryIntent": ".intent",
+        "QueryUnderstanding": ".intent",
+        "SchemaRetriever": ".retriever",
+    },
+)
@@ -0,0 +1,127 @@
+"""Pack retrieved schema chunks into a token-budgeted prompt context."""
+from __future__ import annotations
+from dataclasses import dataclass
+from config import get_settings
+import metrics
+
+SEPARATOR = "\n\n---\n\n"
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token); no tokenizer dependency."""
+    return len(text) // 4 + 1 if text else 0
+
+
+def naive_context(chunks: list[dict]) -> str:
+    """Every retrieved chunk, deduplicated, in retrieval order (the unpacked baseline)."""
+    lines: list[str] = []
+    seen = set()
+    for c in chunks:
+        text = c.get("text") or ""
+        if text and text not in seen:
+            seen.add(text)
+            lines.append(text)
+    return SEPARATOR.join(lines)
+
+
+@dataclass
+class PackedContext:
+    text: str
+    tokens: int
+    baseline_tokens: int  # tokens the unpacked top_k context would have used
+    tables: list[str]
+    chunks_used: int
+    chunks_dropped: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(self.baseline_tokens - self.tokens, 0)
+
+
+class ContextPacker:
+    """Score cutoff + per-table merge + hard token budget.
+
+    1. Drop chunks below context_min_score, and everything after the first score drop larger than
+       context_score_gap (keeping at least context_min_chunks). Pinned chunks (join-path bridges)
+       are exempt, and so are lexical fast-path hits, whose BM25 scores the retriever already cut.
+    2. Merge each table's listing with its relationships into one block; when a table has several
+       column listings only the best-scored one is kept.
+    3. Add table blocks in score order until context_token_budget is reached; blocks of pinned
+       tables are always added, since the join cannot be written without them.
+    """
+
+    def __init__(self):
+        self.settings = get_settings()
+
+    def _cutoff(self, chunks: list[dict]) -> list[dict]:
+        s = self.settings
+        ranked = sorted((c for c in chunks if not c.get("pinned")), key=lambda c: c.get("score", 0.0), reverse=True)
+        kept: list[dict] = []
+        for c in ranked:
+            if len(kept) >= s.context_min_chunks and not c.get("lexical"):
+                if c.get("score", 0.0) < s.context_min_score:
+                    break
+                if kept[-1].get("score", 0.0) - c.get("score", 0.0) > s.context_score_gap:
+                    break
+            kept.append(c)
+        return kept + [c for c in chunks if c.get("pinned")]
+
+    def pack(self, chunks: list[dict]) -> PackedContext:
+        baseline = estimate_tokens(naive_context(chunks))
+        kept = self._cutoff(chunks)
+
+        # table -> best listing + relationship lines, in order of the table's best score
+        listings: dict[str, str] = {}
+        relations: dict[str, list[str]] = {}
+        order: list[str] = []
+        pinned: set[str] = set()
+        for c in kept:
+            table = c.get("table_name", "")
+            text = c.get("text") or ""
+            if table not in order:
+                order.append(table)
+            if c.get("pinned"):
+                pinned.add(table)
+            if c.get("chunk_type") == "relationships":
+                for line in text.split("\n")[1:]:  # first line is the "Table x relationships:" header
+                    line = line.strip()
+                    if line and line not in relations.setdefault(table, []):
+                        relations[table].append(line)
+            elif table not in listings:
+                listings[table] = text  # redundant lower-scored listings of the same table are dropped
+
+        budget = self.settings.context_token_budget
+        blocks: list[str] = []
+        tables: list[str] = []
+        used = 0
+        for table in order:
+            parts = []
+            if table in listings:
+                parts.append(listings[table])
+            else:
+                parts.append(f"Table: {table}")
+            if relations.get(table):
+                parts.append("Foreign keys: " + "; ".join(relations[table]))
+            block = "\n".join(parts)
+            cost = estimate_tokens(block) + (estimate_tokens(SEPARATOR) if blocks else 0)
+            if blocks and budget > 0 and used + cost > budget and table not in pinned:
+                continue  # a smaller block further down may still fit
+            blocks.append(block)
+            tables.append(table)
+            used += cost
+
+        text = SEPARATOR.join(blocks)
+        used_chunks = sum(1 for c in kept if c.get("table_name", "") in tables)
+        packed = PackedContext(
+            text=text,
+            tokens=estimate_tokens(text),
+            baseline_tokens=baseline,
+            tables=tables,
+            chunks_used=used_chunks,
+            chunks_dropped=len(chunks) - used_chunks,
+        )
+        metrics.incr("context_requests")
+        metrics.incr("context_tokens_baseline", packed.baseline_tokens)
+        metrics.incr("context_tokens_packed", packed.tokens)
+        metrics.incr("context_tokens_saved", packed.tokens_saved)
+        return packed
@@ -3,6 +3,7 @@ from __future__ import annotations
 from dataclasses import dataclass
 from config import get_settings
 from llm import chat_completion
+import metrics
 
 
 @dataclass
@@ -11,16 +12,36 @@ class QueryIntent:
     entities: list[str]  # table/column hints
     conditions: list[str]  # filter hints
     summary: str  # one-line summary for retrieval
+    confidence: float = 1.0  # local classifier score; LLM answers count as 1.0
+    source: str = "llm"  # llm | local | skip
 
 
 class QueryUnderstanding:
     """Identify intent and entities from user NL query."""
 
-    def __init__(self):
+    def __init__(self, connection_key: str | None = None):
         self.settings = get_settings()
+        self.connection_key = connection_key
 
     def understand(self, user_query: str) -> QueryIntent:
-        """Parse NL into intent, entities, conditions, summary."""
+        """Parse NL into intent, entities, conditions, summary.
+
+        With INTENT_MODE=local the local classifier answers first; the LLM is only called when its
+        confidence is below LOCAL_INTENT_THRESHOLD.
+        """
+        if self.settings.intent_mode == "local":
+            local = self.classify_locally(user_query)
+            if local.confidence >= self.settings.local_intent_threshold:
+                metrics.incr("intent_local_fast_path")
+                return local
+        metrics.incr("intent_llm")
+        return self.understand_with_llm(user_query)
+
+    def classify_locally(self, user_query: str) -> QueryIntent:
+        from query_understanding.local_intent import LocalIntentClassifier  # imports QueryIntent from here
+        return LocalIntentClassifier(connection_key=self.connection_key).classify(user_query)
+
+    def understand_with_llm(self, user_query: str) -> QueryIntent:
         prompt = f"""Analyze this natural language database question. Output a structured representation.
 
 User question: {user_query}
@@ -0,0 +1,129 @@
+"""Zero-LLM intent classifier: keyword rules + lexical/vector matching against the synced schema.
+
+Produces the same QueryIntent as the LLM call, plus a confidence in [0, 1]. Confidence is the
+share of the question's content words explained by schema identifiers or ENUM values (halved when
+no table is named); when that is low, the question's cosine similarity to its best table chunk is
+mapped onto the same scale, LOCAL_INTENT_VECTOR_THRESHOLD landing on LOCAL_INTENT_THRESHOLD (the
+query embedding is cached, so retrieval reuses it).
+"""
+from __future__ import annotations
+import re
+from query_understanding.intent import QueryIntent
+from schema_ingestion.embedder import SchemaEmbedder
+from schema_ingestion.lexical import get_lexical_index, tokenize
+from schema_ingestion.vector_store import FAISSSchemaStore
+from sql_generation.template_cache import enum_values
+from config import get_settings
+
+_AGGREGATION = re.compile(
+    r"\b(how many|how much|count|number of|total|sum|average|avg|mean|max(imum)?|min(imum)?|"
+    r"most|least|highest|lowest|top \d+|per|by each|group(ed)? by)\b"
+)
+_FILTER = re.compile(
+    r"\b(where|whose|with|without|only|between|before|after|since|during|greater|less|more than|"
+    r"fewer than|over|under|above|below|equal|not|active|inactive|status|last|this|in \d{4})\b|[<>=]"
+)
+_JOIN = re.compile(r"\b(join|along with|together with|and their|with their|for each)\b")
+
+# Condition hints: comparisons, years, relative periods, quoted values
+_CONDITIONS = [
+    re.compile(
+        r"\b(\w+)\s*(>=|<=|>|<|=|greater than|less than|more than|fewer than|over|under|above|below)\s*([\w.$%-]+)"
+    ),
+    re.compile(r"\b(in|since|before|after|during)\s+(\d{4})\b"),
+    re.compile(r"\b(last|this|past|previous)\s+(\d+\s+)?(day|week|month|quarter|year)s?\b"),
+    re.compile(r"['\"]([^'\"]+)['\"]"),
+]
+
+# Words that carry intent, not schema meaning (excluded from coverage)
+_INTENT_WORDS = {
+    tokenize(w)[0]
+    for w in "count number total sum average avg mean max maximum min minimum most least highest lowest top "
+    "first last latest recent name names list show".split()
+}
+
+
+class LocalIntentClassifier:
+    """Classify a question for one connection's synced schema; no LLM call."""
+
+    def __init__(self, connection_key: str | None = None):
+        self.settings = get_settings()
+        self.connection_key = connection_key
+        self.store = FAISSSchemaStore(connection_key=connection_key)
+
+    def classify(self, question: str) -> QueryIntent:
+        q = question.lower()
+        tables, columns, confidence = self._match_schema(question)
+        if len(tables) >= 2 or _JOIN.search(q):
+            intent = "join"
+        elif _AGGREGATION.search(q):
+            intent = "aggregation"
+        elif _FILTER.search(q):
+            intent = "filter"
+        else:
+            intent = "SELECT"
+        conditions = []
+        for pattern in _CONDITIONS:
+            conditions += [" ".join(p for p in m.groups() if p).strip() for m in pattern.finditer(question)]
+        return QueryIntent(
+            intent=intent,
+            entities=tables + columns,
+            conditions=list(dict.fromkeys(conditions)),
+            summary=question.strip(),
+            confidence=round(confidence, 3),
+            source="local",
+        )
+
+    def _match_schema(self, question: str) -> tuple[list[str], list[str], float]:
+        """(tables, columns, confidence) from identifier matches, falling back to vector similarity."""
+        terms = [t for t in dict.fromkeys(tokenize(question, drop_stopwords=True)) if not t.isdigit()]
+        content = [t for t in terms if t not in _INTENT_WORDS]
+        index = get_lexical_index(self.connection_key)
+        tables: list[str] = []
+        columns: list[str] = []
+        confidence = 0.0
+        if index is not None:
+            match = index.search(question, top_k=10)
+            words = set(tokenize(question))  # stopwords included: "total" is also a column word
+            for hit in self.store.get([chunk_id for chunk_id, _ in match.hits]):
+                meta = hit["metadata"]
+                table = meta.get("table_name", "")
+                if table and table not in tables and set(tokenize(table)) <= words:
+                    tables.append(table)
+                for col in (c for c in meta.get("columns", "").split(",") if c):
+                    col_tokens = set(tokenize(col))
+                    if col_tokens and col_tokens <= words and col not in columns and col_tokens - {"id"}:
+                        columns.append(col)
+            enum_terms = self._match_enums(words, columns)
+            explained = [t for t in content if t in index.postings or t in enum_terms]
+            coverage = len(explained) / len(content) if content else (1.0 if tables else 0.0)
+            confidence = coverage if match.names_table else coverage / 2
+        if confidence < self.settings.local_intent_threshold and len(self.store):
+            vector = SchemaEmbedder().embed_texts([question])[0]
+            best = self.store.query(vector, top_k=1)
+            if best:
+                confidence = max(confidence, self._vector_confidence(best[0]["score"]))
+                table = best[0]["metadata"].get("table_name", "")
+                if table and not tables:
+                    tables.append(table)
+        return tables, columns, min(confidence, 1.0)
+
+    def _match_enums(self, words: set[str], columns: list[str]) -> set[str]:
+        """Tokens of ENUM values named in the question ("shipped orders"); their columns become entities."""
+        if self.connection_key is None:
+            return set()
+        terms: set[str] = set()
+        for value, (_, slot) in enum_values(self.connection_key).items():
+            tokens = set(tokenize(value, drop_stopwords=True))
+            if tokens and tokens <= words:
+                terms |= tokens
+                columns += [c for c in slot.removeprefix("enum:").split("|") if c not in columns]
+        return terms
+
+    def _vector_confidence(self, cosine: float) -> float:
+        """Cosine similarity mapped piecewise-linearly onto the coverage scale of the threshold."""
+        s = self.settings
+        lo, hi = s.local_intent_vector_threshold, s.local_intent_threshold
+        if cosine >= lo:
+            return hi + (1 - hi) * (cosine - lo) / (1 - lo) if lo < 1 else hi
+        return hi * max(cosine, 0.0) / lo if lo > 0 else hi
@@ -1,43 +1,227 @@
 """Retrieve relevant schema chunks via similarity search (FAISS + embeddings)."""
 from __future__ import annotations
 from schema_ingestion.embedder import SchemaEmbedder
-from schema_ingestion.vector_store import FAISSSchemaStore
+from schema_ingestion.vector_store import FAISSSchemaStore, column_store_key
+from schema_ingestion.join_graph import get_join_graph
+from schema_ingestion.lexical import LexicalMatch, get_lexical_index
+from query_understanding.context_packer import ContextPacker, PackedContext, estimate_tokens, naive_context
 from config import get_settings
+from lru import LRUCache
+import metrics
+
+# (store key, store generation, column store generation, top_k, query) -> chunks. A re-sync bumps the
+# generation, so stale results are never hit and age out of the LRU.
+_results: LRUCache | None = None
+
+
+def _result_cache() -> LRUCache:
+    global _results
+    if _results is None:
+        _results = LRUCache(maxsize=get_settings().retrieval_cache_size)
+    return _results
+
+
+def retrieval_cache_stats() -> dict:
+    return _result_cache().stats()
+
+
+def _as_chunk(m: dict) -> dict:
+    return {
+        "id": m["id"],
+        "score": m["score"],
+        "text": m["metadata"].get("text", ""),
+        "table_name": m["metadata"].get("table_name", ""),
+        "chunk_type": m["metadata"].get("chunk_type", ""),
+    }
 
 
 class SchemaRetriever:
     """Fetch schema context for a user query using RAG retrieval."""
 
     def __init__(self, connection_key: str | None = None, top_k: int = 10):
+        self.settings = get_settings()
         self.embedder = SchemaEmbedder()
         self.store = FAISSSchemaStore(connection_key=connection_key)
+        self.column_store = FAISSSchemaStore(connection_key=column_store_key(connection_key))
+        self.connection_key = connection_key
         self.top_k = top_k
 
     def retrieve(self, query_text: str) -> list[dict]:
-        """Return top_k relevant schema chunks (text + metadata)."""
-        vectors = self.embedder.embed_texts([query_text])
-        matches = self.store.query(vectors[0], top_k=self.top_k)
-        return [
-            {
-                "id": m["id"],
-                "score": m["score"],
-                "text": m["metadata"].get("text", ""),
-                "table_name": m["metadata"].get("table_name", ""),
-                "chunk_type": m["metadata"].get("chunk_type", ""),
-            }
-            for m in matches
+        """Return top_k relevant schema chunks (text + metadata), plus bridging tables for joins.
+
+        With HYBRID_RETRIEVAL, identifier matches (BM25) are fused with vector scores; when they
+        cover the whole question the embedding call is skipped (lexical fast path). Results are
+        cached per store generation, so a re-sync invalidates them.
+        """
+        key = (
+            self.store.connection_key,
+            self.store.generation,
+            self.column_store.generation,
+            self.top_k,
+            query_text,
+        )
+        cached = _result_cache().get(key)
+        if cached is not None:
+            return list(cached)
+        chunks = self._retrieve(query_text)
+        _result_cache().put(key, chunks)
+        return list(chunks)
+
+    def _retrieve(self, query_text: str) -> list[dict]:
+        s = self.settings
+        lexical = self._lexical(query_text)
+        # Hierarchical mode needs the query vector to pick columns, so the fast path would save nothing
+        hierarchical = s.retrieval_mode == "hierarchical" and len(self.column_store)
+        fast_path = s.lexical_fast_path and not hierarchical
+        if lexical is not None and fast_path and lexical.confident(s.lexical_fast_path_coverage):
+            metrics.incr("retrieval_lexical_fast_path")
+            # Normalized BM25 is not on the cosine scale of the packer's cutoffs: apply our own here
+            scores = {i: score for i, score in lexical.hits if score >= s.lexical_min_score}
+            matches = [m | {"score": scores[m["id"]]} for m in self.store.get(list(scores))]
+            chunks = [_as_chunk(m) | {"lexical": True} for m in matches]
+        else:
+            metrics.incr("retrieval_vector")
+            vector = self.embedder.embed_texts([query_text])[0]
+            matches = self.store.query(vector, top_k=self.top_k)
+            if lexical is not None and lexical.hits:
+                matches = self._fuse(vector, matches, lexical)
+            if hierarchical:
+                chunks = self._retrieve_hierarchical(vector, matches)
+            else:
+                chunks = [_as_chunk(m) for m in matches]
+        if s.join_expansion:
+            chunks += self._join_chunks(chunks)
+        return chunks
+
+    def _lexical(self, query_text: str) -> LexicalMatch | None:
+        if not self.settings.hybrid_retrieval:
+            return None
+        index = get_lexical_index(self.connection_key)
+        return index.search(query_text, top_k=self.top_k) if index is not None else None
+
+    def _fuse(self, vector, matches: list[dict], lexical: LexicalMatch) -> list[dict]:
+        """Weighted sum of cosine and normalized BM25 over the union of both candidate lists."""
+        w = self.settings.lexical_weight
+        lex = dict(lexical.hits)
+        cosine = {m["id"]: m["score"] for m in matches}
+        cosine |= self.store.score(vector, [i for i in lex if i not in cosine])
+        by_id = {m["id"]: m for m in matches}
+        for m in self.store.get([i for i in lex if i not in by_id]):
+            by_id[m["id"]] = m
+        fused = [
+            by_id[i] | {"score": (1 - w) * cosine.get(i, 0.0) + w * lex.get(i, 0.0)}
+            for i in by_id
         ]
+        fused.sort(key=lambda m: m["score"], reverse=True)
+        return fused[: self.top_k]
+
+    def _join_chunks(self, chunks: list[dict]) -> list[dict]:
+        """Chunks for the tables that bridge the top retrieved tables in the FK graph.
+
+        Bridging tables get their stored listing plus one relationships chunk per table on the
+        join path, so the prompt carries every FK the join needs. They are scored like the weakest
+        retrieved chunk and pinned, so packing ranks them last but never drops them.
+        """
+        graph = get_join_graph(self.connection_key)
+        if graph is None or not chunks:
+            return []
+        s = self.settings
+        tables = list(dict.fromkeys(c["table_name"] for c in chunks if c["table_name"]))
+        tables = tables[: s.join_expand_tables]
+        bridges = graph.connect(tables, max_hops=s.join_max_hops)
+        if not bridges:
+            return []
+        score = min(c["score"] for c in chunks)
+        out = [
+            _as_chunk(m) | {"score": score, "pinned": True}
+            for m in self.store.table_chunks(bridges)
+            if m["metadata"].get("chunk_type") != "relationships"
+        ]
+        by_table: dict[str, list[str]] = {}
+        for table, line in graph.references(tables + bridges):
+            by_table.setdefault(table, []).append(f"  {line}")
+        for table, lines in by_table.items():
+            out.append(
+                {
+                    "id": f"join-{table}",
+                    "score": score,
+                    "text": "\n".join([f"Table {table} relationships:"] + lines),
+                    "table_name": table,
+                    "chunk_type": "relationships",
+                    "pinned": True,
+                }
+            )
+        return out
+
+    def _retrieve_hierarchical(self, vector, matches: list[dict]) -> list[dict]:
+        """Level 1 (table summaries) picks tables; level 2 keeps only their relevant columns.
+
+        Each candidate table becomes one "table" chunk listing just the selected columns (plus key
+        columns), followed by its relationships chunk if that was retrieved.
+        """
+        s = self.settings
+        summaries: dict[str, dict] = {}
+        relationships: dict[str, dict] = {}
+        tables: list[str] = []
+        for m in matches:
+            t = m["metadata"].get("table_name", "")
+            if t and t not in tables:
+                tables.append(t)
+            target = relationships if m["metadata"].get("chunk_type") == "relationships" else summaries
+            target.setdefault(t, m)
+        tables = tables[: s.hierarchical_max_tables]
+
+        # Scores every column of the candidate tables (exact); rank decides which are kept
+        picked: dict[str, list[dict]] = {t: [] for t in tables}
+        ranked: dict[str, int] = {t: 0 for t in tables}
+        for c in self.column_store.query(vector, top_k=len(self.column_store), tables=tables):
+            meta = c["metadata"]
+            t = meta["table_name"]
+            if meta.get("key"):
+                picked[t].append(meta)
+            elif ranked[t] < s.hierarchical_columns_per_table:
+                picked[t].append(meta)
+                ranked[t] += 1
+
+        out: list[dict] = []
+        for t in tables:
+            summary = summaries.get(t)
+            if picked[t] and summary:
+                # Keep schema order so the prompt reads like the table definition
+                all_columns = [c for c in summary["metadata"].get("columns", "").split(",") if c]
+                order = {name: i for i, name in enumerate(all_columns)}
+                cols = sorted(picked[t], key=lambda meta: order.get(meta["column"], len(order)))
+                shown = ""
+                if len(all_columns) > len(cols):
+                    shown = f" ({len(cols)} of {len(all_columns)} columns shown)"
+                lines = [
+                    f"Table: {t}",
+                    "Columns: " + ", ".join(f"{m['column']} ({m['type']})" for m in cols) + shown,
+                ]
+                pk = [m["column"] for m in cols if m.get("key") == "pk"]
+                if pk:
+                    lines.append("Primary key: " + ", ".join(pk))
+                out.append(_as_chunk(summary) | {"text": "\n".join(lines)})
+            elif summary:
+                out.append(_as_chunk(summary))
+            if t in relationships:
+                out.append(_as_chunk(relationships[t]))
+        return out
 
     def get_context_for_prompt(self, query_text: str) -> str:
         """Return a single string of retrieved schema context for the LLM prompt."""
-        chunks = self.retrieve(query_text)
+        return self.get_packed_context(query_text).text
+
+    def get_packed_context(self, query_text: str) -> PackedContext:
+        """Retrieved context plus token accounting (packed to the budget when CONTEXT_PACKING is on)."""
+        return self.pack(self.retrieve(query_text))
+
+    def pack(self, chunks: list[dict]) -> PackedContext:
         if not chunks:
-            return "No schema context retrieved."
-        lines = []
-        seen = set()
-        for c in chunks:
-            text = c.get("text") or ""
-            if text and text not in seen:
-                seen.add(text)
-                lines.append(text)
-        return "\n\n---\n\n".join(lines)
+            return PackedContext("No schema context retrieved.", 0, 0, [], 0, 0)
+        if self.settings.context_packing:
+            return ContextPacker().pack(chunks)
+        text = naive_context(chunks)
+        tokens = estimate_tokens(text)
+        tables = list(dict.fromkeys(c.get("table_name", "") for c in chunks))
+        return PackedContext(text, tokens, tokens, tables, len(chunks), 0)
@@ -1,14 +1,15 @@
 """Phase 1: Schema ingestion - extract schema from DB, chunk, embed, store in FAISS."""
-from .extractor import SchemaExtractor
-from .chunker import SchemaChunker
-from .embedder import SchemaEmbedder
-from .vector_store import FAISSSchemaStore
-from .pipeline import SchemaIngestionPipeline
+from lazy import lazy_exports
 
-__all__ = [
-    "SchemaExtractor",
-    "SchemaChunker",
-    "SchemaEmbedder",
-    "FAISSSchemaStore",
-    "SchemaIngestionPipeline",
-]
+__getattr__, __all__ = lazy_exports(
+    __name__,
+    {
+        "SchemaExtractor": ".extractor",
+        "SchemaChunker": ".chunker",
+        "SchemaEmbedder": ".embedder",
+        "FAISSSchemaStore": ".vector_store",
+        "SchemaIngestionPipeline": ".pipeline",
+        "SchemaCatalog": ".catalog",
+        "get_schema_catalog": ".catalog",
+    },
+)
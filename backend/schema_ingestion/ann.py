@@ -0,0 +1,161 @@
+"""Approximate-nearest-neighbour search indexes for large schemas (HNSW / IVF-PQ) and recall reporting.
+
+The ID-mapped flat index stays the source of truth (exact, patchable by id); when the store is large
+an ANN index is derived from it at sync time and used for queries. With VECTOR_STORE_DIR set, the
+flat index is memory-mapped on reload (file-backed pages, shared between workers), and ANN queries
+only read the vectors they re-score. ANN parts that cannot be mapped, like HNSW links, are on the heap.
+"""
+from __future__ import annotations
+import math
+import time
+import numpy as np
+from config import get_settings
+from lazy import lazy_import
+
+faiss = lazy_import("faiss")
+
+INDEX_TYPES = ("flat", "hnsw", "ivfpq")
+
+
+def choose_index_type(n: int, dim: int) -> str:
+    """flat below the threshold; above it HNSW if it fits the memory budget, else IVF-PQ."""
+    s = get_settings()
+    if s.vector_index_type in INDEX_TYPES:
+        return s.vector_index_type
+    if n <= s.vector_index_flat_max:
+        return "flat"
+    hnsw_bytes = n * (dim * 4 + s.hnsw_m * 2 * 4 + 8)  # vectors + level-0 links + id map
+    if hnsw_bytes <= s.vector_memory_budget_mb * 1024 * 1024:
+        return "hnsw"
+    return "ivfpq"
+
+
+def _flat_contents(flat: faiss.IndexIDMap2) -> tuple[np.ndarray, np.ndarray]:
+    """All (vectors, ids) from an ID-mapped flat index."""
+    ids = faiss.vector_to_array(flat.id_map).astype(np.int64)
+    inner = faiss.downcast_index(flat.index)
+    vectors = inner.reconstruct_n(0, inner.ntotal) if inner.ntotal else np.zeros((0, flat.d), dtype=np.float32)
+    return np.ascontiguousarray(vectors, dtype=np.float32), ids
+
+
+def _pq_subquantizers(dim: int, wanted: int) -> int:
+    """Largest divisor of dim that is <= wanted (PQ needs dim % m == 0)."""
+    for m in range(min(wanted, dim), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def build_ann_index(flat: faiss.IndexIDMap2, kind: str) -> faiss.Index | None:
+    """Build (and train) an inner-product ANN index with the same ids as flat. None for kind=flat."""
+    if kind == "flat" or flat.ntotal == 0:
+        return None
+    s = get_settings()
+    vectors, ids = _flat_contents(flat)
+    n, dim = vectors.shape
+    if kind == "hnsw":
+        hnsw = faiss.IndexHNSWFlat(dim, s.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        hnsw.hnsw.efConstruction = s.hnsw_ef_construction
+        index = faiss.IndexIDMap2(hnsw)
+        index.add_with_ids(vectors, ids)
+    elif kind == "ivfpq":
+        nlist = s.ivf_nlist or int(4 * math.sqrt(n))
+        nlist = max(1, min(nlist, n // 39 or 1))  # FAISS wants ~39 training points per centroid
+        quantizer = faiss.IndexFlatIP(dim)
+        nbits = max(4, min(8, int(math.log2(max(n // 39, 16)))))  # 2**nbits PQ centroids need training data
+        index = faiss.IndexIVFPQ(
+            quantizer, dim, nlist, _pq_subquantizers(dim, s.pq_m), nbits, faiss.METRIC_INNER_PRODUCT
+        )
+        train = vectors
+        if n > nlist * 256:
+            rng = np.random.default_rng(0)
+            train = vectors[rng.choice(n, nlist * 256, replace=False)]
+        index.train(train)
+        index.add_with_ids(vectors, ids)
+    else:
+        raise ValueError(f"Unknown vector index type: {kind}")
+    apply_search_params(index)
+    return index
+
+
+def apply_search_params(index: faiss.Index | None) -> None:
+    """Set efSearch / nprobe from settings (after build and after loading from disk)."""
+    if index is None:
+        return
+    s = get_settings()
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    if isinstance(inner, faiss.IndexHNSW):
+        inner.hnsw.efSearch = s.hnsw_ef_search
+    elif isinstance(inner, faiss.IndexIVF):
+        inner.nprobe = s.ivf_nprobe
+
+
+def search(
+    flat: faiss.IndexIDMap2, ann: faiss.Index | None, queries: np.ndarray, k: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """(scores, ids) for queries. IVF-PQ candidates (k * ann_rerank_factor) are re-scored exactly
+    against the flat index, since PQ scores are lossy; HNSW-Flat scores are already exact."""
+    if ann is None:
+        return flat.search(queries, k)
+    factor = get_settings().ann_rerank_factor
+    if not isinstance(ann, faiss.IndexIVF) or factor <= 1:
+        return ann.search(queries, k)
+    _, candidates = ann.search(queries, k * factor)
+    out_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+    out_ids = np.full((len(queries), k), -1, dtype=np.int64)
+    for row, (q, cand) in enumerate(zip(queries, candidates)):
+        cand = cand[cand >= 0]
+        if not len(cand):
+            continue
+        vectors = np.vstack([flat.reconstruct(int(fid)) for fid in cand])
+        scores = vectors @ q
+        top = np.argsort(-scores)[:k]
+        out_scores[row, :len(top)] = scores[top]
+        out_ids[row, :len(top)] = cand[top]
+    return out_scores, out_ids
+
+
+def recall_report(
+    flat: faiss.IndexIDMap2,
+    ann: faiss.Index,
+    k: int = 10,
+    sample: int = 200,
+    noise: float = 0.05,
+) -> dict:
+    """Recall@k and per-query latency of ann vs the exact flat index.
+
+    Queries are stored vectors with Gaussian noise (re-normalized), so they resemble but do not
+    exactly equal indexed chunks.
+    """
+    vectors, _ = _flat_contents(flat)
+    n = vectors.shape[0]
+    if n == 0:
+        return {"n": 0, "k": k, "queries": 0, "recall_at_k": 0.0}
+    rng = np.random.default_rng(0)
+    queries = vectors[rng.choice(n, min(sample, n), replace=False)].copy()
+    queries += rng.normal(0, noise, queries.shape).astype(np.float32)
+    faiss.normalize_L2(queries)
+    k = min(k, n)
+
+    def timed(index: faiss.Index | None) -> tuple[np.ndarray, list[float]]:
+        found, latencies = [], []
+        for q in queries:
+            t0 = time.perf_counter()
+            _, ids = search(flat, index, q.reshape(1, -1), k)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            found.append(ids[0])
+        return np.array(found), latencies
+
+    exact, exact_ms = timed(None)
+    approx, approx_ms = timed(ann)
+    recall = float(np.mean([len(set(e) & set(a)) / k for e, a in zip(exact, approx)]))
+    return {
+        "n": n,
+        "k": k,
+        "queries": len(queries),
+        "recall_at_k": round(recall, 4),
+        "flat_ms_p50": round(float(np.percentile(exact_ms, 50)), 4),
+        "flat_ms_p95": round(float(np.percentile(exact_ms, 95)), 4),
+        "ann_ms_p50": round(float(np.percentile(approx_ms, 50)), 4),
+        "ann_ms_p95": round(float(np.percentile(approx_ms, 95)), 4),
+    }
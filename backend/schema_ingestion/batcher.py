@@ -0,0 +1,118 @@
+"""Cross-request micro-batching for small local embedding calls.
+
+Concurrent chat requests each embed one short query. Instead of N single-row encode() calls
+contending for the CPU, callers enqueue their texts and one worker thread encodes everything
+that arrived within a few milliseconds (or up to max_items) as a single batch.
+"""
+from __future__ import annotations
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable
+import numpy as np
+from config import get_settings
+
+EncodeFn = Callable[[str, list[str]], np.ndarray]
+
+
+class EmbeddingBatcher:
+    """Queue + worker thread; submit() returns a Future resolved with that caller's rows."""
+
+    def __init__(self, encode: EncodeFn, max_wait_ms: float = 5.0, max_items: int = 64):
+        self.encode = encode
+        self.max_wait = max_wait_ms / 1000
+        self.max_items = max_items
+        self._queue: queue.Queue[tuple[str, list[str], Future]] = queue.Queue()
+        self._worker: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.requests = 0
+
+    def submit(self, model: str, texts: list[str]) -> Future:
+        self._ensure_worker()
+        fut: Future = Future()
+        self._queue.put((model, texts, fut))
+        return fut
+
+    def embed(self, model: str, texts: list[str]) -> np.ndarray:
+        return self.submit(model, texts).result()
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._worker.start()
+
+    def _collect(self) -> list[tuple[str, list[str], Future]]:
+        """Block for the first request, then gather more until max_wait elapses or max_items is reached."""
+        pending = [self._queue.get()]
+        count = len(pending[0][1])
+        deadline = time.monotonic() + self.max_wait
+        while count < self.max_items:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            pending.append(item)
+            count += len(item[1])
+        return pending
+
+    def _run(self) -> None:
+        while True:
+            pending = self._collect()
+            by_model: dict[str, list[tuple[list[str], Future]]] = {}
+            for model, texts, fut in pending:
+                if fut.set_running_or_notify_cancel():
+                    by_model.setdefault(model, []).append((texts, fut))
+            for model, calls in by_model.items():
+                self._encode_batch(model, calls)
+
+    def _encode_batch(self, model: str, calls: list[tuple[list[str], Future]]) -> None:
+        texts = [t for call_texts, _ in calls for t in call_texts]
+        try:
+            vectors = self.encode(model, texts)
+        except Exception as e:
+            for _, fut in calls:
+                fut.set_exception(e)
+            return
+        self.batches += 1
+        self.requests += len(calls)
+        start = 0
+        for call_texts, fut in calls:
+            fut.set_result(vectors[start:start + len(call_texts)])
+            start += len(call_texts)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "avg_batch_requests": round(self.requests / self.batches, 2) if self.batches else 0.0,
+            "queued": self._queue.qsize(),
+        }
+
+
+_batcher: EmbeddingBatcher | None = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher(encode: EncodeFn) -> EmbeddingBatcher:
+    """Process-wide batcher (the first caller's encode function is used)."""
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                s = get_settings()
+                _batcher = EmbeddingBatcher(
+                    encode, max_wait_ms=s.embedding_microbatch_wait_ms, max_items=s.embedding_microbatch_max_items
+                )
+    return _batcher
+
+
+def batcher_stats() -> dict | None:
+    return _batcher.stats() if _batcher is not None else None
@@ -0,0 +1,98 @@
+"""Versioned in-memory schema catalog per connection, filled by sync and read by validation."""
+from __future__ import annotations
+import threading
+import time
+from dataclasses import dataclass, field
+from schema_ingestion.extractor import SchemaExtractor, SchemaInfo
+from schema_ingestion.vector_store import FAISSSchemaStore
+from config import get_settings
+from connection import ConnectionConfig, get_connection
+
+
+@dataclass
+class CatalogEntry:
+    schema: SchemaInfo
+    version: int  # bumped on every (re-)extraction for this connection
+    loaded_at: float  # monotonic time of extraction
+    table_names: list[str] = field(default_factory=list)
+    table_set: set[str] = field(default_factory=set)  # lower-cased, for validation
+    store_generation: int = 0  # vector store generation this schema was synced with
+
+
+class SchemaCatalog:
+    """Schema per connection_key. Re-extracts only on explicit sync (put) or TTL miss."""
+
+    def __init__(self):
+        self._entries: dict[str, CatalogEntry] = {}
+        self._lock = threading.Lock()
+        self._load_locks: dict[str, threading.Lock] = {}
+
+    def put(self, connection_key: str, schema: SchemaInfo, store_generation: int | None = None) -> CatalogEntry:
+        """Store a freshly extracted schema and bump its version."""
+        if store_generation is None:
+            store_generation = FAISSSchemaStore(connection_key).generation
+        names = [t.name for t in schema.tables]
+        with self._lock:
+            prev = self._entries.get(connection_key)
+            entry = CatalogEntry(
+                schema=schema,
+                version=(prev.version + 1) if prev else 1,
+                loaded_at=time.monotonic(),
+                table_names=names,
+                table_set={n.lower() for n in names},
+                store_generation=store_generation,
+            )
+            self._entries[connection_key] = entry
+        return entry
+
+    def peek(self, connection_key: str) -> CatalogEntry | None:
+        """Return the cached entry (even if stale) without extracting."""
+        return self._entries.get(connection_key)
+
+    def _is_fresh(self, connection_key: str, entry: CatalogEntry) -> bool:
+        s = get_settings()
+        ttl = s.schema_catalog_ttl_seconds
+        if ttl > 0 and time.monotonic() - entry.loaded_at >= ttl:
+            return False
+        if s.vector_store_shared:
+            # Multi-worker: a sync in another worker bumps the shared store generation
+            return FAISSSchemaStore(connection_key).generation <= entry.store_generation
+        return True
+
+    def get(self, connection_config: ConnectionConfig | None = None) -> CatalogEntry:
+        """Return the entry for this connection, extracting on miss, TTL expiry or a newer shared sync."""
+        conn = get_connection(connection_config)
+        key = conn.connection_key()
+        entry = self._entries.get(key)
+        if entry is not None and self._is_fresh(key, entry):
+            return entry
+        with self._lock:
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+        # One extraction per connection at a time; concurrent callers wait and reuse it
+        with load_lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._is_fresh(key, entry):
+                return entry
+            store_generation = FAISSSchemaStore(key).generation
+            schema = SchemaExtractor(connection_config=conn).extract()
+            return self.put(key, schema, store_generation=store_generation)
+
+    def table_names(self, connection_config: ConnectionConfig | None = None) -> list[str]:
+        return self.get(connection_config).table_names
+
+    def version(self, connection_key: str) -> int:
+        """Current version for connection_key (0 = never loaded)."""
+        entry = self._entries.get(connection_key)
+        return entry.version if entry else 0
+
+    def invalidate(self, connection_key: str) -> None:
+        with self._lock:
+            self._entries.pop(connection_key, None)
+
+
+_catalog = SchemaCatalog()
+
+
+def get_schema_catalog() -> SchemaCatalog:
+    """Process-wide catalog shared by sync, validation and SQL generation."""
+    return _catalog
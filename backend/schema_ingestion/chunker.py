@@ -1,25 +1,61 @@
 """Convert schema text into chunks for embedding."""
 from __future__ import annotations
-from dataclasses import dataclass
+import hashlib
+import json
+from dataclasses import dataclass, field
 from schema_ingestion.extractor import SchemaInfo, TableInfo
 
 
+def _column_references(table: TableInfo) -> dict[str, str]:
+    """column name -> "referred_table(referred_column)" for single- and multi-column FKs."""
+    refs: dict[str, str] = {}
+    for fk in table.foreign_keys:
+        cols = [c.strip() for c in fk["columns"].split(",")]
+        ref_cols = [c.strip() for c in fk["referred_columns"].split(",")]
+        for col, ref_col in zip(cols, ref_cols):
+            refs[col] = f"{fk['referred_table']}({ref_col})"
+    return refs
+
+
 @dataclass
 class SchemaChunk:
     text: str
     table_name: str
-    chunk_type: str  # "table" | "columns" | "relationships"
+    chunk_type: str  # "table" | "columns" | "relationships" | "column"
     metadata: dict
+    content_hash: str = field(default="", init=False)  # sha256 of everything that gets embedded/stored
+
+    def __post_init__(self):
+        payload = json.dumps(
+            [self.table_name, self.chunk_type, self.text, self.metadata], sort_keys=True, default=str
+        )
+        self.content_hash = hashlib.sha256(payload.encode()).hexdigest()
+
+    @property
+    def chunk_id(self) -> str:
+        """Content-addressed id: unchanged chunks keep their id (and vector) across syncs."""
+        return f"chunk-{self.content_hash[:16]}"
 
 
 class SchemaChunker:
-    """Split schema into retrievable chunks (per-table + relationship chunks)."""
+    """Split schema into retrievable chunks (per-table + relationship chunks).
+
+    hierarchical=True emits compact table summaries (column names only, capped) for table-level
+    retrieval; chunk_columns() then gives one chunk per column for the second retrieval level.
+    """
+
+    def __init__(self, hierarchical: bool = False, summary_max_columns: int = 30):
+        self.hierarchical = hierarchical
+        self.summary_max_columns = summary_max_columns
 
     def chunk(self, schema: SchemaInfo) -> list[SchemaChunk]:
         chunks: list[SchemaChunk] = []
         for table in schema.tables:
             # One chunk per table: name + columns + PK
-            table_chunk = self._table_to_chunk(table)
+            if self.hierarchical:
+                table_chunk = self._table_to_summary_chunk(table)
+            else:
+                table_chunk = self._table_to_chunk(table)
             chunks.append(table_chunk)
             # Relationship chunk if FKs exist
             if table.foreign_keys:
@@ -42,6 +78,42 @@ class SchemaChunker:
             metadata={"columns": [c.name for c in table.columns], "pk": table.primary_key},
         )
 
+    def chunk_columns(self, schema: SchemaInfo) -> list[SchemaChunk]:
+        """One chunk per column (second level of hierarchical retrieval)."""
+        chunks: list[SchemaChunk] = []
+        for table in schema.tables:
+            refs = _column_references(table)
+            for col in table.columns:
+                key = "pk" if col.name in table.primary_key else ("fk" if col.name in refs else "")
+                lines = [f"Column: {table.name}.{col.name} ({col.type})"]
+                if key == "pk":
+                    lines.append("Primary key")
+                if col.name in refs:
+                    lines.append(f"References {refs[col.name]}")
+                chunks.append(
+                    SchemaChunk(
+                        text="\n".join(lines),
+                        table_name=table.name,
+                        chunk_type="column",
+                        metadata={"column": col.name, "type": col.type, "key": key},
+                    )
+                )
+        return chunks
+
+    def _table_to_summary_chunk(self, table: TableInfo) -> SchemaChunk:
+        names = [c.name for c in table.columns]
+        shown = names[: self.summary_max_columns]
+        more = f" (+{len(names) - len(shown)} more)" if len(names) > len(shown) else ""
+        lines = [f"Table: {table.name}", "Columns: " + ", ".join(shown) + more]
+        if table.primary_key:
+            lines.append("Primary key: " + ", ".join(table.primary_key))
+        return SchemaChunk(
+            text="\n".join(lines),
+            table_name=table.name,
+            chunk_type="table",
+            metadata={"columns": names, "pk": table.primary_key},
+        )
+
     def _relationships_to_chunk(self, table: TableInfo) -> SchemaChunk:
         lines = [f"Table {table.name} relationships:"]
         for fk in table.foreign_keys:
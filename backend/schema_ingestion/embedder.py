@@ -1,17 +1,67 @@
-"""Generate embeddings for schema chunks (OpenAI or HuggingFace)."""
+"""Generate embeddings for schema chunks (OpenAI, HuggingFace, or HuggingFace models on ONNX Runtime)."""
 from __future__ import annotations
-from openai import OpenAI
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from schema_ingestion.chunker import SchemaChunk
+from schema_ingestion.model_registry import get_hf_model, get_onnx_model
+from schema_ingestion.embedding_cache import get_embedding_cache
+from schema_ingestion.batcher import get_batcher
+from llm.clients import get_openai_client
 from config import get_settings
 
+# OpenAI embeddings API limits per request
+OPENAI_MAX_INPUTS = 2048
+OPENAI_MAX_REQUEST_TOKENS = 300_000
+
+
+def _normalize(arr: np.ndarray) -> np.ndarray:
+    """L2-normalize rows in place (cosine == inner product downstream)."""
+    norms = np.linalg.norm(arr, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    arr /= norms
+    return arr
+
+
+def _openai_batches(texts: list[str]) -> list[list[str]]:
+    """Split texts into requests under the input-count and (approximate, ~4 chars/token) token limits."""
+    batches: list[list[str]] = []
+    current: list[str] = []
+    tokens = 0
+    for t in texts:
+        n = len(t) // 4 + 1
+        if current and (len(current) >= OPENAI_MAX_INPUTS or tokens + n > OPENAI_MAX_REQUEST_TOKENS):
+            batches.append(current)
+            current, tokens = [], 0
+        current.append(t)
+        tokens += n
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _encode_local(model_key: str, texts: list[str]) -> np.ndarray:
+    """Encode with the local model named by model_key ("huggingface:<name>" or "onnx[-int8]:<name>")."""
+    backend, name = model_key.split(":", 1)
+    # Shared across embedders/requests; loaded once per process
+    model = get_hf_model(name) if backend == "huggingface" else get_onnx_model(name, backend == "onnx-int8")
+    emb = model.encode(
+        texts,
+        batch_size=get_settings().embedding_batch_size,
+        normalize_embeddings=True,
+        convert_to_numpy=True,
+        show_progress_bar=False,
+    )
+    return np.ascontiguousarray(emb, dtype=np.float32)
+
 
 class SchemaEmbedder:
-    """Embed schema chunks using OpenAI or HuggingFace (local, no API key)."""
+    """Embed schema chunks using OpenAI or HuggingFace (local, no API key; PyTorch or ONNX Runtime).
+
+    Vectors are returned as one C-contiguous float32 array (n, dim), L2-normalized.
+    """
 
     def __init__(self):
         self.settings = get_settings()
-        self._client: OpenAI | None = None
-        self._hf_model = None
 
     def _use_openai(self) -> bool:
         """Use OpenAI only when provider is openai and API key is set."""
@@ -20,35 +70,71 @@ class SchemaEmbedder:
             and bool(self.settings.openai_api_key)
         )
 
-    def _get_openai_client(self) -> OpenAI:
-        if self._client is None:
-            self._client = OpenAI(api_key=self.settings.openai_api_key)
-        return self._client
+    def model_key(self) -> str:
+        """Identifies the vector space; part of every embedding cache key."""
+        if self._use_openai():
+            return f"openai:{self.settings.embedding_model}"
+        if self.settings.embedding_provider == "onnx":
+            # Quantized vectors differ slightly from fp32 ones, so they are a separate vector space
+            backend = "onnx-int8" if self.settings.onnx_quantize else "onnx"
+            return f"{backend}:{self.settings.embedding_model}"
+        return f"huggingface:{self.settings.embedding_model}"
+
+    def embed_texts(self, texts: list[str]) -> np.ndarray:
+        """Return a (len(texts), dim) float32 array; only cache misses reach the model/API."""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        if not self.settings.embedding_cache_enabled:
+            return self._embed_uncached(texts)
+        cache = get_embedding_cache()
+        model = self.model_key()
+        cached = cache.get_many(model, texts)
+        missing = list(dict.fromkeys(t for t, v in zip(texts, cached) if v is None))
+        if not missing:
+            return np.ascontiguousarray(np.vstack(cached), dtype=np.float32)
+        fresh = self._embed_uncached(missing)
+        cache.put_many(model, missing, fresh)
+        out = np.empty((len(texts), fresh.shape[1]), dtype=np.float32)
+        row = {t: i for i, t in enumerate(missing)}
+        for i, (t, v) in enumerate(zip(texts, cached)):
+            out[i] = fresh[row[t]] if v is None else v
+        return out
 
-    def embed_texts(self, texts: list[str]) -> list[list[float]]:
-        """Return list of embedding vectors for each text."""
+    def _embed_uncached(self, texts: list[str]) -> np.ndarray:
         if self._use_openai():
-            client = self._get_openai_client()
-            resp = client.embeddings.create(
-                model=self.settings.embedding_model,
-                input=texts,
-            )
-            return [d.embedding for d in resp.data]
-        return self._embed_hf(texts)
-
-    def _embed_hf(self, texts: list[str]) -> list[list[float]]:
+            return self._embed_openai(texts)
+        return self._embed_local(texts)
+
+    def _embed_openai(self, texts: list[str]) -> np.ndarray:
+        """Chunk to the API limits and send the requests concurrently."""
+        client = get_openai_client()  # shared, pooled keep-alive connections
+        model = self.settings.embedding_model
+
+        def call(batch: list[str]) -> np.ndarray:
+            resp = client.embeddings.create(model=model, input=batch)
+            return np.array([d.embedding for d in resp.data], dtype=np.float32)
+
+        batches = _openai_batches(texts)
+        if len(batches) == 1:
+            parts = [call(batches[0])]
+        else:
+            workers = max(1, min(self.settings.openai_embedding_concurrency, len(batches)))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                parts = list(pool.map(call, batches))
+        return _normalize(np.ascontiguousarray(np.vstack(parts), dtype=np.float32))
+
+    def _embed_local(self, texts: list[str]) -> np.ndarray:
+        s = self.settings
+        model = self.model_key()
         try:
-            from sentence_transformers import SentenceTransformer
-            if self._hf_model is None:
-                model_name = self.settings.embedding_model or "all-MiniLM-L6-v2"
-                self._hf_model = SentenceTransformer(model_name)
-            emb = self._hf_model.encode(texts)
-            return [e.tolist() for e in emb]
+            if s.embedding_microbatch and len(texts) < s.embedding_microbatch_max_items:
+                # Small (query) calls from concurrent requests are encoded together
+                return get_batcher(_encode_local).embed(model, texts)
+            return _encode_local(model, texts)
         except Exception as e:
-            raise RuntimeError(f"HuggingFace embedding failed: {e}") from e
+            backend = model.split(":", 1)[0]  # huggingface | onnx | onnx-int8
+            raise RuntimeError(f"{backend} embedding failed ({s.embedding_model}): {e}") from e
 
-    def embed_chunks(self, chunks: list[SchemaChunk]) -> list[tuple[SchemaChunk, list[float]]]:
-        """Embed all chunks; return (chunk, vector) pairs."""
-        texts = [c.text for c in chunks]
-        vectors = self.embed_texts(texts)
-        return list(zip(chunks, vectors))
+    def embed_chunks(self, chunks: list[SchemaChunk]) -> np.ndarray:
+        """Embed all chunks; row i is the vector for chunks[i]."""
+        return self.embed_texts([c.text for c in chunks])
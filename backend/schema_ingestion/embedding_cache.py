@@ -0,0 +1,117 @@
+"""Content-addressed embedding cache: (model, sha256(text)) -> vector, in-process LRU over SQLite."""
+from __future__ import annotations
+import hashlib
+import os
+import sqlite3
+import threading
+import numpy as np
+from config import get_settings
+from lru import LRUCache
+
+_DB_FILE = "embeddings.sqlite3"
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class EmbeddingCache:
+    """Two-level cache: memory LRU first, then an on-disk SQLite table shared by all workers."""
+
+    def __init__(self, cache_dir: str = "", maxsize: int = 10000):
+        self.memory = LRUCache(maxsize=maxsize)
+        self._path = os.path.join(cache_dir, _DB_FILE) if cache_dir else None
+        self._db: sqlite3.Connection | None = None
+        self._db_lock = threading.Lock()
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _conn(self) -> sqlite3.Connection | None:
+        if self._path is None:
+            return None
+        if self._db is None:
+            os.makedirs(os.path.dirname(self._path), exist_ok=True)
+            db = sqlite3.connect(self._path, check_same_thread=False, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")  # concurrent readers across workers
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " model TEXT NOT NULL, hash TEXT NOT NULL, dim INTEGER NOT NULL, vec BLOB NOT NULL,"
+                " PRIMARY KEY (model, hash))"
+            )
+            db.commit()
+            self._db = db
+        return self._db
+
+    def get_many(self, model: str, texts: list[str]) -> list[np.ndarray | None]:
+        """Cached float32 vector per text, or None for a miss."""
+        hashes = [text_hash(t) for t in texts]
+        out: list[np.ndarray | None] = [self.memory.get((model, h)) for h in hashes]
+        pending = {h for h, v in zip(hashes, out) if v is None}
+        if pending:
+            found = self._disk_get(model, list(pending))
+            for i, h in enumerate(hashes):
+                if out[i] is None and h in found:
+                    out[i] = found[h]
+                    self.memory.put((model, h), found[h])
+            self.disk_hits += sum(1 for h in pending if h in found)
+            self.misses += sum(1 for h in pending if h not in found)
+        return out
+
+    def put_many(self, model: str, texts: list[str], vectors) -> None:
+        rows = []
+        for t, v in zip(texts, vectors):
+            vec = np.array(v, dtype=np.float32)  # own copy, not a view pinning the whole batch
+            h = text_hash(t)
+            self.memory.put((model, h), vec)
+            rows.append((model, h, int(vec.shape[0]), vec.tobytes()))
+        db = self._conn()
+        if db is None or not rows:
+            return
+        with self._db_lock:
+            db.executemany("INSERT OR REPLACE INTO embeddings (model, hash, dim, vec) VALUES (?, ?, ?, ?)", rows)
+            db.commit()
+
+    def _disk_get(self, model: str, hashes: list[str]) -> dict[str, np.ndarray]:
+        db = self._conn()
+        if db is None:
+            return {}
+        found: dict[str, np.ndarray] = {}
+        with self._db_lock:
+            for start in range(0, len(hashes), 500):  # stay under SQLite's bound-parameter limit
+                batch = hashes[start:start + 500]
+                marks = ",".join("?" * len(batch))
+                rows = db.execute(
+                    f"SELECT hash, vec FROM embeddings WHERE model = ? AND hash IN ({marks})",
+                    [model, *batch],
+                ).fetchall()
+                for h, blob in rows:
+                    found[h] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def stats(self) -> dict:
+        """memory_hits / disk_hits avoid model or OpenAI calls; misses were embedded."""
+        served = self.memory.hits + self.disk_hits
+        lookups = served + self.misses
+        return {
+            "memory_entries": len(self.memory),
+            "memory_hits": self.memory.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(served / lookups, 4) if lookups else 0.0,
+            "persistent": self._path is not None,
+        }
+
+
+_cache: EmbeddingCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Process-wide embedding cache configured from settings."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                s = get_settings()
+                _cache = EmbeddingCache(cache_dir=s.embedding_cache_dir, maxsize=s.embedding_cache_size)
+    return _cache
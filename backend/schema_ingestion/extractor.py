@@ -1,11 +1,14 @@
 """Extract schema (tables, columns, types, FKs) from MySQL/Postgres."""
 from __future__ import annotations
+import re
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from typing import Any
-from sqlalchemy import create_engine, inspect, text
+from sqlalchemy import inspect, text
 from sqlalchemy.engine import Engine
 from config import get_settings
 from connection import get_connection, ConnectionConfig
+from engines import get_engine
 
 
 @dataclass
@@ -29,6 +32,96 @@ class TableInfo:
 class SchemaInfo:
     tables: list[TableInfo] = field(default_factory=list)
     raw_text: str = ""
+    row_count_strategy: str = "none"  # strategy actually used: estimate | exact | none
+
+
+def _as_bool(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.upper() in ("YES", "TRUE", "T", "1")
+    return bool(value)
+
+
+def _upper_type(column_type: str) -> str:
+    """Upper-case a column type except quoted values: enum('active') -> ENUM('active')."""
+    return re.sub(r"'(?:[^']|'')*'|[^']+", lambda m: m.group() if m.group().startswith("'") else m.group().upper(), column_type)
+
+
+# Bulk catalog queries. Every query aliases its columns to the same lower-case names.
+# Primary-key rows have referred_table NULL; FK rows carry the referenced table/column.
+_MYSQL_BULK = {
+    "tables": """
+        SELECT TABLE_NAME AS table_name
+        FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_TYPE = 'BASE TABLE'
+        ORDER BY TABLE_NAME
+    """,
+    "columns": """
+        SELECT TABLE_NAME AS table_name, COLUMN_NAME AS column_name, COLUMN_TYPE AS column_type,
+               IS_NULLABLE AS is_nullable, COLUMN_DEFAULT AS column_default
+        FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE()
+        ORDER BY TABLE_NAME, ORDINAL_POSITION
+    """,
+    "keys": """
+        SELECT TABLE_NAME AS table_name, CONSTRAINT_NAME AS constraint_name, COLUMN_NAME AS column_name,
+               REFERENCED_TABLE_NAME AS referred_table, REFERENCED_COLUMN_NAME AS referred_column
+        FROM information_schema.KEY_COLUMN_USAGE
+        WHERE TABLE_SCHEMA = DATABASE()
+          AND (CONSTRAINT_NAME = 'PRIMARY' OR REFERENCED_TABLE_NAME IS NOT NULL)
+        ORDER BY TABLE_NAME, CONSTRAINT_NAME, ORDINAL_POSITION
+    """,
+}
+
+_PG_BULK = {
+    "tables": """
+        SELECT c.relname AS table_name
+        FROM pg_catalog.pg_class c
+        JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = current_schema() AND c.relkind IN ('r', 'p')
+        ORDER BY c.relname
+    """,
+    "columns": """
+        SELECT c.relname AS table_name, a.attname AS column_name,
+               pg_catalog.format_type(a.atttypid, a.atttypmod) AS column_type,
+               NOT a.attnotnull AS is_nullable,
+               pg_catalog.pg_get_expr(d.adbin, d.adrelid) AS column_default
+        FROM pg_catalog.pg_attribute a
+        JOIN pg_catalog.pg_class c ON c.oid = a.attrelid
+        JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+        LEFT JOIN pg_catalog.pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+        WHERE n.nspname = current_schema() AND c.relkind IN ('r', 'p')
+          AND a.attnum > 0 AND NOT a.attisdropped
+        ORDER BY c.relname, a.attnum
+    """,
+    "keys": """
+        SELECT cl.relname AS table_name, con.conname AS constraint_name, att.attname AS column_name,
+               CASE WHEN con.contype = 'f' THEN rcl.relname END AS referred_table,
+               ratt.attname AS referred_column
+        FROM pg_catalog.pg_constraint con
+        JOIN pg_catalog.pg_class cl ON cl.oid = con.conrelid
+        JOIN pg_catalog.pg_namespace n ON n.oid = cl.relnamespace
+        CROSS JOIN LATERAL unnest(con.conkey) WITH ORDINALITY AS k(attnum, ord)
+        JOIN pg_catalog.pg_attribute att ON att.attrelid = con.conrelid AND att.attnum = k.attnum
+        LEFT JOIN pg_catalog.pg_class rcl ON rcl.oid = con.confrelid
+        LEFT JOIN pg_catalog.pg_attribute ratt
+               ON ratt.attrelid = con.confrelid AND ratt.attnum = con.confkey[k.ord]
+        WHERE n.nspname = current_schema() AND con.contype IN ('p', 'f')
+        ORDER BY cl.relname, con.conname, k.ord
+    """,
+}
+
+_MYSQL_ROW_ESTIMATES = """
+    SELECT TABLE_NAME AS table_name, TABLE_ROWS AS row_count
+    FROM information_schema.TABLES
+    WHERE TABLE_SCHEMA = DATABASE()
+"""
+
+_PG_ROW_ESTIMATES = """
+    SELECT c.relname AS table_name, c.reltuples::bigint AS row_count
+    FROM pg_catalog.pg_class c
+    JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = current_schema() AND c.relkind IN ('r', 'p')
+"""
 
 
 class SchemaExtractor:
@@ -37,16 +130,36 @@ class SchemaExtractor:
     def __init__(self, connection_config: ConnectionConfig | None = None):
         self.conn = get_connection(connection_config)
         self.database_type = self.conn.database_type
+        self.settings = get_settings()
         self._engine: Engine | None = None
 
     def _get_engine(self) -> Engine:
         if self._engine is None:
-            self._engine = create_engine(self.conn.sqlalchemy_url())
+            self._engine = get_engine(self.conn)
         return self._engine
 
     def extract(self) -> SchemaInfo:
         """Extract tables, columns, types, FKs (and optional sample stats)."""
         engine = self._get_engine()
+        tables: list[TableInfo] | None = None
+        mode = self.settings.schema_extraction_mode
+        if mode in ("auto", "bulk"):
+            try:
+                tables = self._extract_bulk(engine)
+            except Exception:
+                if mode == "bulk":
+                    raise
+                tables = None  # e.g. no access to information_schema / pg_catalog
+        if tables is None:
+            tables = self._extract_inspector(engine)
+
+        strategy = self._fill_row_counts(engine, tables)
+        schema = SchemaInfo(tables=tables, row_count_strategy=strategy)
+        schema.raw_text = self._schema_to_text(schema)
+        return schema
+
+    def _extract_inspector(self, engine: Engine) -> list[TableInfo]:
+        """Fallback: per-table SQLAlchemy Inspector calls (works on any dialect, slow on wide schemas)."""
         inspector = inspect(engine)
         tables: list[TableInfo] = []
 
@@ -75,28 +188,124 @@ class SchemaExtractor:
                     }
                 )
 
-            # Optional: sample row count (lightweight)
-            try:
-                quoted = f'"{table_name}"' if self.database_type == "postgres" else f"`{table_name}`"
-                with engine.connect() as conn:
-                    r = conn.execute(text(f"SELECT COUNT(*) FROM {quoted}"))
-                    sample_row_count = r.scalar() or 0
-            except Exception:
-                sample_row_count = 0
-
             tables.append(
                 TableInfo(
                     name=table_name,
                     columns=columns,
                     primary_key=primary_key,
                     foreign_keys=foreign_keys,
-                    sample_row_count=sample_row_count,
                 )
             )
+        return tables
 
-        schema = SchemaInfo(tables=tables)
-        schema.raw_text = self._schema_to_text(schema)
-        return schema
+    def _extract_bulk(self, engine: Engine) -> list[TableInfo] | None:
+        """Set-based extraction: tables, columns and keys in three catalog queries on one connection.
+
+        Returns None for dialects without a bulk query set (caller falls back to Inspector).
+        """
+        if self.database_type == "postgres":
+            queries = _PG_BULK
+        elif self.database_type == "mysql":
+            queries = _MYSQL_BULK
+        else:
+            return None
+        with engine.connect() as conn:
+            table_rows = conn.execute(text(queries["tables"])).all()
+            column_rows = conn.execute(text(queries["columns"])).all()
+            key_rows = conn.execute(text(queries["keys"])).all()
+
+        by_name: dict[str, TableInfo] = {r.table_name: TableInfo(name=r.table_name) for r in table_rows}
+        for r in column_rows:
+            table = by_name.get(r.table_name)
+            if table is None:
+                continue  # view or other non-base relation
+            table.columns.append(
+                ColumnInfo(
+                    name=r.column_name,
+                    type=_upper_type(str(r.column_type)),
+                    nullable=_as_bool(r.is_nullable),
+                    default=str(r.column_default) if r.column_default is not None else None,
+                )
+            )
+
+        # Rows are ordered by table, constraint, position: group multi-column FKs per constraint
+        # (table, constraint) -> (referred_table, columns, referred_columns)
+        fks: dict[tuple[str, str], tuple[str, list[str], list[str]]] = {}
+        for r in key_rows:
+            table = by_name.get(r.table_name)
+            if table is None:
+                continue
+            if r.referred_table is None:
+                table.primary_key.append(r.column_name)
+                continue
+            _, cols, ref_cols = fks.setdefault((r.table_name, r.constraint_name), (r.referred_table, [], []))
+            cols.append(r.column_name)
+            ref_cols.append(r.referred_column)
+        for (table_name, _), (referred_table, cols, ref_cols) in fks.items():
+            by_name[table_name].foreign_keys.append(
+                {
+                    "columns": ", ".join(cols),
+                    "referred_table": referred_table,
+                    "referred_columns": ", ".join(ref_cols),
+                }
+            )
+        return list(by_name.values())
+
+    def _fill_row_counts(self, engine: Engine, tables: list[TableInfo]) -> str:
+        """Set sample_row_count per ROW_COUNT_STRATEGY; returns the strategy actually used.
+
+        estimate: catalog statistics (one query, no table scans); exact: COUNT(*) in a bounded
+        thread pool with a per-statement timeout; none: skip.
+        """
+        strategy = self.settings.row_count_strategy
+        if strategy == "estimate":
+            try:
+                self._estimate_row_counts(engine, tables)
+                return "estimate"
+            except Exception:
+                return "none"  # no catalog access: leave counts at 0 rather than scanning
+        if strategy == "exact":
+            self._exact_row_counts(engine, tables)
+            return "exact"
+        return "none"
+
+    def _estimate_row_counts(self, engine: Engine, tables: list[TableInfo]) -> None:
+        if self.database_type == "postgres":
+            sql = _PG_ROW_ESTIMATES
+        elif self.database_type == "mysql":
+            sql = _MYSQL_ROW_ESTIMATES
+        else:
+            raise ValueError(f"No row estimates for {self.database_type}")
+        with engine.connect() as conn:
+            estimates = {r.table_name: r.row_count for r in conn.execute(text(sql))}
+        for table in tables:
+            # reltuples is -1 for never-analyzed tables (Postgres 14+)
+            table.sample_row_count = max(int(estimates.get(table.name) or 0), 0)
+
+    def _exact_row_counts(self, engine: Engine, tables: list[TableInfo]) -> None:
+        s = self.settings
+        # Never ask for more connections than the pool can hand out
+        workers = max(1, min(s.row_count_workers, s.db_pool_size + s.db_max_overflow, len(tables) or 1))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            counts = pool.map(lambda t: self._count_rows(engine, t.name), tables)
+            for table, count in zip(tables, counts):
+                table.sample_row_count = count
+
+    def _count_rows(self, engine: Engine, table_name: str) -> int:
+        """COUNT(*) with a per-statement timeout; 0 on timeout or error."""
+        timeout_ms = self.settings.row_count_timeout_ms
+        try:
+            with engine.connect() as conn:
+                if self.database_type == "postgres":
+                    if timeout_ms > 0:
+                        conn.execute(text(f"SET LOCAL statement_timeout = {int(timeout_ms)}"))
+                    sql = f'SELECT COUNT(*) FROM "{table_name}"'
+                else:
+                    hint = f"/*+ MAX_EXECUTION_TIME({int(timeout_ms)}) */ " if timeout_ms > 0 else ""
+                    sql = f"SELECT {hint}COUNT(*) FROM `{table_name}`"
+                return conn.execute(text(sql)).scalar() or 0
+        except Exception:
+            return 0
 
     def _schema_to_text(self, schema: SchemaInfo) -> str:
         """Convert schema to human-readable text for chunking."""
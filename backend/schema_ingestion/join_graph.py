@@ -0,0 +1,133 @@
+"""Foreign-key join graph per connection: shortest join paths between retrieved tables.
+
+Built from the extracted schema at sync and kept next to the FAISS store (join_graph.json in the
+store directory when VECTOR_STORE_DIR is set). Paths are BFS over the undirected FK graph and
+cached per graph, so a lookup after the first is a dict hit.
+"""
+from __future__ import annotations
+import hashlib
+import json
+from collections import deque
+from dataclasses import dataclass, field
+from schema_ingestion.extractor import SchemaInfo
+from schema_ingestion.sidecar import load_sidecar, save_sidecar
+
+# One FK edge as seen from one side: (neighbor table, local columns, neighbor columns, local side
+# holds the FK). Column lists are comma-separated, as in TableInfo.foreign_keys.
+Edge = tuple[str, str, str, bool]
+
+
+@dataclass
+class JoinGraph:
+    edges: dict[str, list[Edge]] = field(default_factory=dict)
+    fingerprint: str = ""
+    _paths: dict[tuple[str, str], list[str] | None] = field(default_factory=dict, repr=False)
+
+    def path(self, source: str, target: str, max_hops: int = 3) -> list[str] | None:
+        """Shortest table path source -> target (both included), or None if further than max_hops."""
+        if source == target:
+            return [source]
+        key = (source, target)
+        if key not in self._paths:
+            self._paths[key] = self._bfs(source, target)
+        found = self._paths[key]
+        if found is None or len(found) - 1 > max_hops:
+            return None
+        return found
+
+    def _bfs(self, source: str, target: str) -> list[str] | None:
+        if source not in self.edges or target not in self.edges:
+            return None
+        parents: dict[str, str | None] = {source: None}
+        queue = deque([source])
+        while queue:
+            table = queue.popleft()
+            for neighbor, *_ in self.edges[table]:
+                if neighbor in parents:
+                    continue
+                parents[neighbor] = table
+                if neighbor == target:
+                    out = [target]
+                    while parents[out[-1]] is not None:
+                        out.append(parents[out[-1]])
+                    return out[::-1]
+                queue.append(neighbor)
+        return None
+
+    def connect(self, tables: list[str], max_hops: int = 3) -> list[str]:
+        """Bridging tables (not in tables) that join tables into one connected set.
+
+        Greedy: tables are attached in order, each through its shortest path to any table already
+        connected. Tables with no path within max_hops are left unconnected.
+        """
+        connected = [t for t in tables[:1] if t in self.edges]
+        bridges: list[str] = []
+        for table in tables[1:]:
+            if table not in self.edges or table in connected:
+                continue
+            best = None
+            for other in connected:
+                p = self.path(table, other, max_hops)
+                if p is not None and (best is None or len(p) < len(best)):
+                    best = p
+            if best is None:
+                if not connected:
+                    connected.append(table)
+                continue
+            for t in best:
+                if t not in connected:
+                    connected.append(t)
+                    if t not in tables and t not in bridges:
+                        bridges.append(t)
+        return bridges
+
+    def references(self, tables: list[str]) -> list[tuple[str, str]]:
+        """(referencing table, "cols references other(cols)") for every FK between two of tables."""
+        members = set(tables)
+        out = []
+        for t in tables:
+            for neighbor, cols, ref_cols, outgoing in self.edges.get(t, []):
+                if outgoing and neighbor in members:
+                    out.append((t, f"{cols} references {neighbor}({ref_cols})"))
+        return out
+
+    def to_json(self) -> dict:
+        return {"fingerprint": self.fingerprint, "edges": self.edges}
+
+    @classmethod
+    def from_json(cls, data: dict) -> JoinGraph:
+        edges = {t: [tuple(e) for e in es] for t, es in data.get("edges", {}).items()}
+        return cls(edges=edges, fingerprint=data.get("fingerprint", ""))
+
+
+def build_join_graph(schema: SchemaInfo) -> JoinGraph:
+    """Undirected FK adjacency over every table (tables without FKs are isolated nodes)."""
+    names = {t.name for t in schema.tables}
+    edges: dict[str, list[Edge]] = {t.name: [] for t in schema.tables}
+    for t in schema.tables:
+        for fk in t.foreign_keys:
+            ref = fk["referred_table"]
+            if ref not in names or ref == t.name:
+                continue
+            edges[t.name].append((ref, fk["columns"], fk["referred_columns"], True))
+            edges[ref].append((t.name, fk["referred_columns"], fk["columns"], False))
+    for t in edges:
+        edges[t].sort()
+    fingerprint = hashlib.sha256(json.dumps(edges, sort_keys=True).encode()).hexdigest()
+    return JoinGraph(edges=edges, fingerprint=fingerprint)
+
+
+_SIDECAR = "join_graph"
+
+
+def save_join_graph(connection_key: str | None, graph: JoinGraph) -> bool:
+    """Keep graph for connection_key (and persist it). Returns False if it was already current."""
+    current = get_join_graph(connection_key)
+    if current is not None and current.fingerprint == graph.fingerprint:
+        return False
+    save_sidecar(connection_key, _SIDECAR, graph, graph.to_json())
+    return True
+
+
+def get_join_graph(connection_key: str | None) -> JoinGraph | None:
+    return load_sidecar(connection_key, _SIDECAR, JoinGraph.from_json)
@@ -0,0 +1,139 @@
+"""BM25 inverted index over schema identifiers (table and column names), built at sync.
+
+Identifiers are split on snake_case / camelCase boundaries and lightly stemmed, so "how many
+customers" matches the customer table and "order items" matches order_items. Kept next to the
+FAISS store like the join graph.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import math
+import re
+from dataclasses import dataclass, field
+from schema_ingestion.sidecar import load_sidecar, save_sidecar
+
+_SIDECAR = "lexical"
+
+# Question filler that never names schema objects
+STOPWORDS = frozenset(
+    """a all an and any are as at be by can did do does each for from get give had has have how i
+    in is it list many me much my of on or per please show that the their there these this those
+    to total was we were what when where which who whose with""".split()
+)
+
+_CAMEL = re.compile(r"(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])")
+_SPLIT = re.compile(r"[^a-z0-9]+")
+
+
+def stem(word: str) -> str:
+    """Plural / verb-suffix stripping; enough to match identifiers against natural language."""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 4 and word.endswith(("sses", "xes", "ches", "shes")):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    if len(word) > 5 and word.endswith("ing"):
+        return word[:-3]
+    if len(word) > 4 and word.endswith("ed"):
+        return word[:-2]
+    return word
+
+
+def tokenize(text: str, drop_stopwords: bool = False) -> list[str]:
+    """Identifier-aware tokens: orderItems / order_items / "order items" -> ["order", "item"]."""
+    words = _SPLIT.split(_CAMEL.sub(" ", text).lower())
+    return [stem(w) for w in words if w and not (drop_stopwords and w in STOPWORDS)]
+
+
+@dataclass
+class LexicalMatch:
+    hits: list[tuple[str, float]]  # (chunk id, BM25 score normalized to the top hit = 1.0)
+    coverage: float  # share of the query's content tokens found in the index vocabulary
+    names_table: bool  # a query token matched a table-name token
+
+    def confident(self, min_coverage: float) -> bool:
+        return bool(self.hits) and self.names_table and self.coverage >= min_coverage
+
+
+@dataclass
+class LexicalIndex:
+    doc_ids: list[str] = field(default_factory=list)
+    doc_lengths: list[int] = field(default_factory=list)
+    postings: dict[str, list[tuple[int, int]]] = field(default_factory=dict)  # term -> [(doc, tf)]
+    table_terms: set[str] = field(default_factory=set)
+    fingerprint: str = ""
+    k1: float = 1.2
+    b: float = 0.75
+
+    def search(self, query: str, top_k: int = 10) -> LexicalMatch:
+        terms = list(dict.fromkeys(tokenize(query, drop_stopwords=True)))
+        if not terms or not self.doc_ids:
+            return LexicalMatch([], 0.0, False)
+        known = [t for t in terms if t in self.postings]
+        n = len(self.doc_ids)
+        avgdl = sum(self.doc_lengths) / n
+        scores: dict[int, float] = {}
+        for term in known:
+            posting = self.postings[term]
+            idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for doc, tf in posting:
+                norm = tf + self.k1 * (1 - self.b + self.b * self.doc_lengths[doc] / avgdl)
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * (self.k1 + 1) / norm
+        ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:top_k]
+        top = ranked[0][1] if ranked else 1.0
+        return LexicalMatch(
+            hits=[(self.doc_ids[doc], score / top) for doc, score in ranked],
+            coverage=len(known) / len(terms),
+            names_table=any(t in self.table_terms for t in known),
+        )
+
+    def to_json(self) -> dict:
+        return {
+            "doc_ids": self.doc_ids,
+            "doc_lengths": self.doc_lengths,
+            "postings": self.postings,
+            "table_terms": sorted(self.table_terms),
+            "fingerprint": self.fingerprint,
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> LexicalIndex:
+        return cls(
+            doc_ids=data["doc_ids"],
+            doc_lengths=data["doc_lengths"],
+            postings={t: [tuple(p) for p in ps] for t, ps in data["postings"].items()},
+            table_terms=set(data["table_terms"]),
+            fingerprint=data.get("fingerprint", ""),
+        )
+
+
+def build_lexical_index(documents: list[tuple[str, str, list[str]]]) -> LexicalIndex:
+    """Index (chunk id, table name, column names) documents. The table name counts twice."""
+    index = LexicalIndex()
+    for doc, (chunk_id, table, columns) in enumerate(documents):
+        table_tokens = tokenize(table)
+        tokens = table_tokens * 2 + [t for c in columns for t in tokenize(c)]
+        index.doc_ids.append(chunk_id)
+        index.doc_lengths.append(len(tokens))
+        index.table_terms.update(table_tokens)
+        counts: dict[str, int] = {}
+        for t in tokens:
+            counts[t] = counts.get(t, 0) + 1
+        for t, tf in counts.items():
+            index.postings.setdefault(t, []).append((doc, tf))
+    index.fingerprint = hashlib.sha256(json.dumps(documents, sort_keys=True).encode()).hexdigest()
+    return index
+
+
+def save_lexical_index(connection_key: str | None, index: LexicalIndex) -> bool:
+    """Keep index for connection_key (and persist it). Returns False if it was already current."""
+    current = get_lexical_index(connection_key)
+    if current is not None and current.fingerprint == index.fingerprint:
+        return False
+    save_sidecar(connection_key, _SIDECAR, index, index.to_json())
+    return True
+
+
+def get_lexical_index(connection_key: str | None) -> LexicalIndex | None:
+    return load_sidecar(connection_key, _SIDECAR, LexicalIndex.from_json)
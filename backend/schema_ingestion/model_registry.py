@@ -0,0 +1,55 @@
+"""Process-level embedding model registry: each HuggingFace (or ONNX) model is loaded once and shared."""
+from __future__ import annotations
+import threading
+from typing import Any
+from config import get_settings
+
+DEFAULT_HF_MODEL = "all-MiniLM-L6-v2"
+
+_models: dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def get_hf_model(model_name: str | None = None) -> Any:
+    """Return the shared SentenceTransformer for model_name, loading it on first use (thread-safe)."""
+    name = model_name or get_settings().embedding_model or DEFAULT_HF_MODEL
+    model = _models.get(name)
+    if model is not None:
+        return model
+    with _lock:
+        # Another thread may have loaded it while we waited for the lock
+        model = _models.get(name)
+        if model is None:
+            from sentence_transformers import SentenceTransformer
+            model = SentenceTransformer(name)
+            _models[name] = model
+    return model
+
+
+def get_onnx_model(model_name: str | None = None, quantize: bool = False) -> Any:
+    """Return the shared OnnxEncoder for model_name, exporting/quantizing it on first use."""
+    s = get_settings()
+    name = model_name or s.embedding_model or DEFAULT_HF_MODEL
+    key = f"onnx-int8:{name}" if quantize else f"onnx:{name}"
+    model = _models.get(key)
+    if model is not None:
+        return model
+    with _lock:
+        model = _models.get(key)
+        if model is None:
+            from schema_ingestion.onnx_encoder import OnnxEncoder
+            model = OnnxEncoder(name, quantize=quantize, max_seq_length=s.onnx_max_seq_length)
+            _models[key] = model
+    return model
+
+
+def preload_embedding_model() -> bool:
+    """Load the configured local embedding model now (app startup). Returns True if loaded."""
+    s = get_settings()
+    if s.embedding_provider == "openai" and s.openai_api_key:
+        return False
+    if s.embedding_provider == "onnx":
+        get_onnx_model(s.embedding_model, s.onnx_quantize)
+    else:
+        get_hf_model(s.embedding_model)
+    return True
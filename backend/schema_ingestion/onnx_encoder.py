@@ -0,0 +1,106 @@
+"""ONNX Runtime backend for sentence-transformers models (CPU, optionally int8-quantized).
+
+The model is exported once (needs optimum + torch) into ONNX_CACHE_DIR; later processes only load
+onnxruntime and the fast tokenizer, so neither torch nor sentence-transformers is imported.
+encode() mirrors SentenceTransformer.encode for the arguments the embedder uses: mean pooling
+over the attention mask, then optional L2 normalization.
+"""
+from __future__ import annotations
+import os
+import threading
+import numpy as np
+from config import get_settings
+
+_MODEL_FILE = "model.onnx"
+_QUANTIZED_FILE = "model_quantized.onnx"
+_TOKENIZER_FILE = "tokenizer.json"
+
+
+def _hub_name(model_name: str) -> str:
+    """sentence-transformers short names (all-MiniLM-L6-v2) live under the sentence-transformers org."""
+    return model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+
+
+def model_dir(model_name: str) -> str:
+    base = os.path.expanduser(get_settings().onnx_cache_dir)
+    return os.path.join(base, _hub_name(model_name).replace("/", "__"))
+
+
+def export_model(model_name: str, quantize: bool) -> str:
+    """Export (and optionally quantize) model_name into the cache; returns the .onnx path to load."""
+    d = model_dir(model_name)
+    path = os.path.join(d, _MODEL_FILE)
+    if not os.path.exists(path):
+        try:
+            from optimum.onnxruntime import ORTModelForFeatureExtraction
+            from transformers import AutoTokenizer
+        except ImportError as e:
+            raise RuntimeError(
+                "Exporting to ONNX needs optimum[onnxruntime] (pip install -r requirements-onnx.txt); "
+                f"or place an exported {_MODEL_FILE} and {_TOKENIZER_FILE} in {d}"
+            ) from e
+        os.makedirs(d, exist_ok=True)
+        ORTModelForFeatureExtraction.from_pretrained(_hub_name(model_name), export=True).save_pretrained(d)
+        AutoTokenizer.from_pretrained(_hub_name(model_name)).save_pretrained(d)
+    if not quantize:
+        return path
+    quantized = os.path.join(d, _QUANTIZED_FILE)
+    if not os.path.exists(quantized):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        tmp = f"{quantized}.tmp-{os.getpid()}"
+        quantize_dynamic(path, tmp, weight_type=QuantType.QInt8)
+        os.replace(tmp, quantized)
+    return quantized
+
+
+class OnnxEncoder:
+    """SentenceTransformer-compatible encode() on an ONNX Runtime session."""
+
+    def __init__(self, model_name: str, quantize: bool = False, max_seq_length: int = 256):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        s = get_settings()
+        path = export_model(model_name, quantize)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if s.onnx_threads:
+            options.intra_op_num_threads = s.onnx_threads
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = Tokenizer.from_file(os.path.join(os.path.dirname(path), _TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=max_seq_length)
+        self.tokenizer.enable_padding()
+        self.quantized = quantize
+        self._lock = threading.Lock()  # the tokenizer's padding/truncation state is shared
+
+    def encode(
+        self,
+        texts: list[str],
+        batch_size: int = 32,
+        normalize_embeddings: bool = False,
+        convert_to_numpy: bool = True,
+        show_progress_bar: bool = False,
+    ) -> np.ndarray:
+        parts = [self._encode_batch(texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)]
+        emb = np.vstack(parts) if parts else np.zeros((0, 0), dtype=np.float32)
+        if normalize_embeddings and len(emb):
+            norms = np.linalg.norm(emb, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            emb /= norms
+        return emb
+
+    def _encode_batch(self, texts: list[str]) -> np.ndarray:
+        with self._lock:
+            encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+        token_embeddings = self.session.run(None, feeds)[0]  # (batch, seq, dim)
+        # Mean pooling over real tokens, as sentence-transformers' default Pooling layer does
+        weights = mask[..., None].astype(np.float32)
+        summed = (token_embeddings * weights).sum(axis=1)
+        return (summed / np.clip(weights.sum(axis=1), 1e-9, None)).astype(np.float32)
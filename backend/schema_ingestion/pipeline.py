@@ -1,51 +1,125 @@
 """Phase 1 pipeline: extract schema -> chunk -> embed -> store in FAISS."""
 from __future__ import annotations
-import uuid
+import hashlib
 from schema_ingestion.extractor import SchemaExtractor
-from schema_ingestion.chunker import SchemaChunker
+from schema_ingestion.chunker import SchemaChunk, SchemaChunker
 from schema_ingestion.embedder import SchemaEmbedder
-from schema_ingestion.vector_store import FAISSSchemaStore
+from schema_ingestion.vector_store import FAISSSchemaStore, column_store_key
+from schema_ingestion.catalog import get_schema_catalog
+from schema_ingestion.join_graph import build_join_graph, save_join_graph
+from schema_ingestion.lexical import build_lexical_index, save_lexical_index
+from config import get_settings
 from connection import ConnectionConfig, get_connection
 
 
+def schema_fingerprint(chunks: list[SchemaChunk], embedding_model: str) -> str:
+    """Cheap whole-schema fingerprint: sorted chunk hashes + embedding model."""
+    h = hashlib.sha256(embedding_model.encode())
+    for content_hash in sorted(c.content_hash for c in chunks):
+        h.update(content_hash.encode())
+    return h.hexdigest()
+
+
+def _identifiers(c: SchemaChunk) -> tuple[str, str, list[str]]:
+    """(chunk id, table, column names) document for the lexical index.
+
+    Only the chunk's own table and columns: indexing a relationships chunk's FK columns and
+    referenced tables made "how many customers" rank orders' relationships above customers.
+    """
+    return c.chunk_id, c.table_name, list(c.metadata.get("columns", []))
+
+
+def _chunk_metadata(c: SchemaChunk) -> dict:
+    meta = {
+        "table_name": c.table_name,
+        "chunk_type": c.chunk_type,
+        "text": c.text[:1000],  # Pinecone metadata size limit
+        "content_hash": c.content_hash,
+    } | c.metadata
+    # Normalize metadata values for JSON/store
+    for k in list(meta.keys()):
+        val = meta[k]
+        if isinstance(val, list):
+            meta[k] = ",".join(str(x) for x in val)
+    return meta
+
+
 class SchemaIngestionPipeline:
     """Orchestrate schema extraction, chunking, embedding, and vector storage."""
 
     def __init__(self, connection_config: ConnectionConfig | None = None):
         conn = get_connection(connection_config)
+        s = get_settings()
+        self.connection_key = conn.connection_key()
+        self.hierarchical = s.retrieval_mode == "hierarchical"
         self.extractor = SchemaExtractor(connection_config=conn)
-        self.chunker = SchemaChunker()
+        self.chunker = SchemaChunker(hierarchical=self.hierarchical, summary_max_columns=s.table_summary_max_columns)
         self.embedder = SchemaEmbedder()
         self.store = FAISSSchemaStore(connection_key=conn.connection_key())
+        self.column_store = FAISSSchemaStore(connection_key=column_store_key(conn.connection_key()))
 
     def run(self) -> dict:
-        """Run full pipeline. Returns stats (tables, chunks, vectors)."""
+        """Run incremental sync: only added/changed chunks are embedded, removed ones deleted.
+
+        Returns stats (tables, chunks, vectors_upserted, chunks_reused, chunks_deleted, unchanged, ...).
+        In hierarchical mode the per-column store is synced too (column_chunks; counts include it).
+        """
         schema = self.extractor.extract()
         chunks = self.chunker.chunk(schema)
-        embedded = self.embedder.embed_chunks(chunks)
-
-        ids = [f"chunk-{uuid.uuid4().hex[:12]}" for _ in chunks]
-        vectors = [v for _, v in embedded]
-        metadatas = [
-            {
-                "table_name": c.table_name,
-                "chunk_type": c.chunk_type,
-                "text": c.text[:1000],  # Pinecone metadata size limit
-            }
-            | c.metadata
-            for c in chunks
-        ]
-        # Normalize metadata values for JSON/store
-        for m in metadatas:
-            for k in list(m.keys()):
-                val = m[k]
-                if isinstance(val, list):
-                    m[k] = ",".join(str(x) for x in val)
-
-        self.store.upsert(ids=ids, vectors=vectors, metadatas=metadatas)
+        model = self.embedder.model_key()
 
-        return {
+        sync = self._sync_store(self.store, chunks, model)
+        stats = {
             "tables": len(schema.tables),
             "chunks": len(chunks),
-            "vectors_upserted": len(ids),
+            "row_count_strategy": schema.row_count_strategy,
+        } | sync
+        if self.hierarchical:
+            column_chunks = self.chunker.chunk_columns(schema)
+            col_sync = self._sync_store(self.column_store, column_chunks, model)
+            stats["column_chunks"] = len(column_chunks)
+            for k in ("vectors_upserted", "chunks_reused", "chunks_deleted"):
+                stats[k] += col_sync[k]
+            stats["unchanged"] = sync["unchanged"] and col_sync["unchanged"]
+        else:
+            self.column_store.clear()  # free column vectors left from a hierarchical sync
+
+        graph = build_join_graph(schema)
+        stats["join_graph_updated"] = save_join_graph(self.connection_key, graph)
+        stats["join_edges"] = sum(len(e) for e in graph.edges.values()) // 2
+        save_lexical_index(self.connection_key, build_lexical_index([_identifiers(c) for c in chunks]))
+
+        entry = get_schema_catalog().put(self.connection_key, schema, store_generation=self.store.generation)
+        stats["schema_version"] = entry.version
+        return stats
+
+    def _sync_store(self, store: FAISSSchemaStore, chunks: list[SchemaChunk], model: str) -> dict:
+        """Patch one store to hold exactly these chunks, embedding only new/changed ones."""
+        fingerprint = schema_fingerprint(chunks, model)
+        if fingerprint == store.fingerprint:
+            # No-op sync: nothing to embed or patch
+            return {"vectors_upserted": 0, "chunks_reused": len(chunks), "chunks_deleted": 0, "unchanged": True}
+
+        # A different embedding model makes every stored vector stale
+        rebuild = store.embedding_model != model
+        existing = set() if rebuild else set(store.ids())
+        current = {c.chunk_id: c for c in chunks}
+        new_chunks = [c for cid, c in current.items() if cid not in existing]
+        removed = [cid for cid in existing if cid not in current]
+
+        vectors = self.embedder.embed_chunks(new_chunks) if new_chunks else None
+        store.apply(
+            ids=[c.chunk_id for c in new_chunks],
+            vectors=vectors,
+            metadatas=[_chunk_metadata(c) for c in new_chunks],
+            delete_ids=removed,
+            fingerprint=fingerprint,
+            embedding_model=model,
+            replace=rebuild,
+        )
+        return {
+            "vectors_upserted": len(new_chunks),
+            "chunks_reused": len(current) - len(new_chunks),
+            "chunks_deleted": len(removed),
+            "unchanged": False,
         }
@@ -0,0 +1,65 @@
+"""Small JSON structures kept next to a connection's FAISS store (join graph, lexical index).
+
+In memory per process; with VECTOR_STORE_DIR set also written to the store directory, and
+reloaded when another worker rewrote the file (one stat call per lookup).
+"""
+from __future__ import annotations
+import json
+import os
+import threading
+from typing import Any, Callable
+from schema_ingestion.vector_store import store_dir, store_key, write_atomic
+
+# (key, name) -> (file mtime or None, parsed object)
+_sidecars: dict[tuple[str, str], tuple[float | None, Any]] = {}
+_lock = threading.Lock()
+
+
+def _path(key: str, name: str) -> str | None:
+    d = store_dir(key)
+    return os.path.join(d, f"{name}.json") if d else None
+
+
+def _mtime(path: str | None) -> float | None:
+    try:
+        return os.stat(path).st_mtime if path else None
+    except OSError:
+        return None
+
+
+def save_sidecar(connection_key: str | None, name: str, obj: Any, data: dict) -> None:
+    """Keep obj in memory and persist its JSON form (data)."""
+    key = store_key(connection_key)
+    path = _path(key, name)
+    with _lock:
+        if path:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+            def write(p: str) -> None:
+                with open(p, "w") as f:
+                    json.dump(data, f)
+
+            write_atomic(path, write)
+        _sidecars[(key, name)] = (_mtime(path), obj)
+
+
+def load_sidecar(connection_key: str | None, name: str, parse: Callable[[dict], Any]) -> Any | None:
+    """Current object for (connection_key, name), parsing the file again only when it changed."""
+    key = store_key(connection_key)
+    path = _path(key, name)
+    cached = _sidecars.get((key, name))
+    if path is None:
+        return cached[1] if cached else None
+    mtime = _mtime(path)
+    if cached is not None and (mtime is None or cached[0] == mtime):
+        return cached[1]
+    if mtime is None:
+        return None
+    with _lock:
+        try:
+            with open(path) as f:
+                obj = parse(json.load(f))
+        except (OSError, ValueError, KeyError):
+            return cached[1] if cached else None
+        _sidecars[(key, name)] = (mtime, obj)
+    return obj
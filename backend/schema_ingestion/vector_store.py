@@ -1,58 +1,437 @@
-"""In-memory FAISS vector store: no disk I/O (production-friendly, stateless across restarts)."""
+"""FAISS vector store per connection: in-memory, optionally persisted to disk and memory-mapped on reload.
+
+Reloaded flat indexes keep their vectors in the mapped file (IO_FLAG_MMAP_IFC): the pages live in the
+OS page cache, shared by every worker that maps the same generation, instead of private heap copies.
+"""
 from __future__ import annotations
+import fcntl
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 import numpy as np
-import faiss
+from cache import vector_generation_get, vector_generation_set
+from schema_ingestion.ann import apply_search_params, build_ann_index, choose_index_type, recall_report, search
 from config import get_settings
-from typing import Any
+from lazy import lazy_import
+
+faiss = lazy_import("faiss")  # ~50 ms to import; deferred until a store is built or loaded
+
+
+@dataclass
+class _IndexState:
+    """Immutable snapshot of one store; writers build a new snapshot and swap it in."""
+    index: faiss.IndexIDMap2  # exact, ID-mapped flat index (source of truth, patched by id)
+    dim: int
+    entries: dict[int, tuple[str, dict]] = field(default_factory=dict)  # faiss id -> (chunk id, metadata)
+    fingerprint: str = ""  # whole-schema fingerprint of the last sync
+    embedding_model: str = ""
+    generation: int = 0  # bumped on every change
+    ann: faiss.Index | None = None  # derived HNSW / IVF-PQ search index for large stores
+    index_type: str = "flat"
+    _by_table: dict[str, list[int]] | None = None  # table_name -> faiss ids, built on first use
+
+    def table_ids(self) -> dict[str, list[int]]:
+        if self._by_table is None:
+            by_table: dict[str, list[int]] = {}
+            for fid, (_, meta) in self.entries.items():
+                by_table.setdefault(meta.get("table_name", ""), []).append(fid)
+            self._by_table = by_table
+        return self._by_table
+
 
 # Global in-process store per connection_key so sync and chat share the same index
-_stores: dict[str, tuple[faiss.IndexFlatIP, list[str], list[dict]]] = {}
+_stores: dict[str, _IndexState] = {}
+_write_lock = threading.Lock()
+_load_lock = threading.Lock()
+_generation_checks: dict[str, tuple[float, int | None]] = {}  # key -> (monotonic time, published generation)
+
+_META_FILE = "meta.json"
+_GENERATION_FILE = "generation"
+_LOCK_FILE = ".lock"
 
 
-def _store_key(connection_key: str | None) -> str:
+def store_key(connection_key: str | None) -> str:
     return connection_key or "default"
 
 
+def column_store_key(connection_key: str | None) -> str:
+    """Key of the per-column store used by hierarchical retrieval."""
+    return f"{store_key(connection_key)}-columns"
+
+
+def _faiss_id(id_: str) -> int:
+    """Stable non-negative int64 FAISS id for a string chunk id."""
+    return int(hashlib.sha256(id_.encode()).hexdigest()[:15], 16)
+
+
+def store_dir(key: str) -> str | None:
+    """Directory for a persisted store, or None when VECTOR_STORE_DIR is unset (memory only)."""
+    base = get_settings().vector_store_dir
+    return os.path.join(base, key) if base else None
+
+
+def write_atomic(path: str, write) -> None:
+    """Write via a temp file in the same directory, then rename over path."""
+    tmp = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _save_state(key: str, state: _IndexState) -> None:
+    """Persist index then metadata. meta.json names its index file, so it is replaced last:
+    a reader always sees a matching (meta, index) pair."""
+    d = store_dir(key)
+    if d is None:
+        return
+    os.makedirs(d, exist_ok=True)
+    index_file = f"index-{state.generation}.faiss"
+    write_atomic(os.path.join(d, index_file), lambda p: faiss.write_index(state.index, p))
+    ann_file = None
+    if state.ann is not None:
+        ann_file = f"ann-{state.generation}.faiss"
+        write_atomic(os.path.join(d, ann_file), lambda p: faiss.write_index(state.ann, p))
+    meta = {
+        "index_file": index_file,
+        "ann_file": ann_file,
+        "index_type": state.index_type,
+        "dim": state.dim,
+        "fingerprint": state.fingerprint,
+        "embedding_model": state.embedding_model,
+        "generation": state.generation,
+        "entries": [[fid, id_, m] for fid, (id_, m) in state.entries.items()],
+    }
+
+    def write_meta(p: str) -> None:
+        with open(p, "w") as f:
+            json.dump(meta, f)
+
+    write_atomic(os.path.join(d, _META_FILE), write_meta)
+    # Keep the previous index for readers that loaded the old meta.json a moment ago
+    gens = (state.generation, state.generation - 1)
+    keep = {f"{prefix}-{gen}.faiss" for prefix in ("index", "ann") for gen in gens}
+    for name in os.listdir(d):
+        if name.startswith(("index-", "ann-")) and name.endswith(".faiss") and name not in keep:
+            try:
+                os.remove(os.path.join(d, name))
+            except OSError:
+                pass
+
+
+def _shared() -> bool:
+    s = get_settings()
+    return bool(s.vector_store_dir) and s.vector_store_shared
+
+
+def _publish_generation(key: str, generation: int) -> None:
+    """Announce a new generation to other workers (Redis, with a file fallback)."""
+    if vector_generation_set(key, generation):
+        return
+    d = store_dir(key)
+
+    def write(p: str) -> None:
+        with open(p, "w") as f:
+            f.write(str(generation))
+
+    write_atomic(os.path.join(d, _GENERATION_FILE), write)
+
+
+def _shared_generation(key: str) -> int | None:
+    """Latest generation published by any worker; None if nothing was published yet."""
+    gen = vector_generation_get(key)
+    if gen is not None:
+        return gen
+    try:
+        with open(os.path.join(store_dir(key), _GENERATION_FILE)) as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return None
+
+
+@contextmanager
+def _writer_lock(key: str):
+    """Serialize writers: per process always, across workers (flock) in shared mode."""
+    with _write_lock:
+        if not _shared():
+            yield
+            return
+        d = store_dir(key)
+        os.makedirs(d, exist_ok=True)
+        with open(os.path.join(d, _LOCK_FILE), "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _load_state(key: str) -> _IndexState | None:
+    """Load a persisted store; flat vector storage is memory-mapped rather than read into RAM.
+
+    Plain IO_FLAG_MMAP only maps inverted lists, so IndexFlat / IndexIDMap2 codes were still copied
+    onto the heap; IO_FLAG_MMAP_IFC (faiss >= 1.10) maps them too. The mapped codes are read-only.
+    """
+    d = store_dir(key)
+    if d is None:
+        return None
+    try:
+        with open(os.path.join(d, _META_FILE)) as f:
+            meta = json.load(f)
+        flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+        index = faiss.read_index(os.path.join(d, meta["index_file"]), flags)
+        ann = None
+        if meta.get("ann_file"):
+            ann = faiss.read_index(os.path.join(d, meta["ann_file"]), flags)
+            apply_search_params(ann)
+    except (OSError, ValueError, KeyError, RuntimeError):
+        return None
+    return _IndexState(
+        index=index,
+        dim=meta["dim"],
+        entries={int(fid): (id_, m) for fid, id_, m in meta["entries"]},
+        fingerprint=meta.get("fingerprint", ""),
+        embedding_model=meta.get("embedding_model", ""),
+        generation=meta.get("generation", 0),
+        ann=ann,
+        index_type=meta.get("index_type", "flat"),
+    )
+
+
 class FAISSSchemaStore:
-    """In-memory vector store: upsert and query by connection_key. No disk persistence."""
+    """Vector store keyed by connection_key, patched incrementally by id (persisted if VECTOR_STORE_DIR set)."""
 
     def __init__(self, connection_key: str | None = None):
         self.settings = get_settings()
         self.connection_key = connection_key
-        self._key = _store_key(connection_key)
-        self._index: faiss.IndexFlatIP | None = None
-        self._id_list: list[str] = []
-        self._metadatas: list[dict] = []
-        if self._key in _stores:
-            self._index, self._id_list, self._metadatas = _stores[self._key]
-
-    def upsert(self, ids: list[str], vectors: list[list[float]], metadatas: list[dict]) -> None:
-        """Replace store with these vectors (full replace). Vectors should be normalized for cosine."""
-        if not vectors:
-            return
-        dim = len(vectors[0])
-        arr = np.array(vectors, dtype=np.float32)
-        faiss.normalize_L2(arr)
-        index = faiss.IndexFlatIP(dim)
-        index.add(arr)
-        self._index = index
-        self._id_list = list(ids)
-        self._metadatas = list(metadatas)
-        _stores[self._key] = (self._index, self._id_list, self._metadatas)
-
-    def query(self, vector: list[float], top_k: int = 10) -> list[dict]:
-        """Return top_k matches with id, score, and metadata."""
-        if self._index is None or not self._id_list:
+        self._key = store_key(connection_key)
+
+    def _state(self, fresh: bool = False) -> _IndexState | None:
+        """Current snapshot; loaded lazily from VECTOR_STORE_DIR on first use after a restart.
+
+        In shared mode another worker may have synced since: the published generation is checked
+        at most once per VECTOR_STORE_GENERATION_TTL, or always with fresh=True (writers).
+        """
+        state = _stores.get(self._key)
+        if not self.settings.vector_store_dir:
+            return state
+        stale = state is None
+        if not stale and _shared():
+            published = self._published_generation(fresh)
+            stale = published is not None and published > state.generation
+        if stale:
+            with _load_lock:
+                current = _stores.get(self._key)
+                if current is not state:
+                    return current  # another thread reloaded while we waited
+                loaded = _load_state(self._key)
+                if loaded is not None and (state is None or loaded.generation > state.generation):
+                    _stores[self._key] = state = loaded
+        return state
+
+    def _published_generation(self, fresh: bool) -> int | None:
+        now = time.monotonic()
+        checked = _generation_checks.get(self._key)
+        if not fresh and checked is not None and now - checked[0] < self.settings.vector_store_generation_ttl:
+            return checked[1]
+        published = _shared_generation(self._key)  # one small Redis GET / file read
+        _generation_checks[self._key] = (now, published)
+        return published
+
+    @property
+    def fingerprint(self) -> str:
+        state = self._state()
+        return state.fingerprint if state else ""
+
+    @property
+    def embedding_model(self) -> str:
+        state = self._state()
+        return state.embedding_model if state else ""
+
+    @property
+    def generation(self) -> int:
+        state = self._state()
+        return state.generation if state else 0
+
+    def ids(self) -> list[str]:
+        """Chunk ids currently stored."""
+        state = self._state()
+        return [chunk_id for chunk_id, _ in state.entries.values()] if state else []
+
+    def __len__(self) -> int:
+        state = self._state()
+        return len(state.entries) if state else 0
+
+    def upsert(self, ids: list[str], vectors: np.ndarray, metadatas: list[dict]) -> None:
+        """Add or replace vectors by id. Vectors must be L2-normalized (SchemaEmbedder output is)."""
+        self.apply(ids=ids, vectors=vectors, metadatas=metadatas)
+
+    def delete(self, ids: list[str]) -> None:
+        self.apply(delete_ids=ids)
+
+    def clear(self) -> None:
+        """Drop every vector (keeps the generation counter moving forward)."""
+        if len(self):
+            self.apply(delete_ids=self.ids(), fingerprint="")
+
+    def apply(
+        self,
+        ids: list[str] | None = None,
+        vectors: np.ndarray | None = None,
+        metadatas: list[dict] | None = None,
+        delete_ids: list[str] | None = None,
+        fingerprint: str | None = None,
+        embedding_model: str | None = None,
+        replace: bool = False,
+    ) -> None:
+        """Patch the store in one step: delete ids, add/replace ids, set fingerprint.
+
+        The current index is copied and patched, then swapped in, so concurrent queries keep
+        searching a consistent snapshot. replace=True starts from an empty index.
+        """
+        ids = ids or []
+        metadatas = metadatas or []
+        arr = None
+        if vectors is not None and len(vectors):
+            arr = np.ascontiguousarray(vectors, dtype=np.float32)
+        with _writer_lock(self._key):
+            old = None if replace else self._state(fresh=True)
+            dim = arr.shape[1] if arr is not None else (old.dim if old else 0)
+            if old is not None and old.dim != dim:
+                old = None  # embedding dimension changed: rebuild from scratch
+            if old is None and arr is None and not fingerprint:
+                return
+            if old is not None:
+                # Not clone_index: a clone of a memory-mapped index still views the read-only mapping
+                index = faiss.deserialize_index(faiss.serialize_index(old.index))
+                entries = dict(old.entries)
+            else:
+                index = faiss.IndexIDMap2(faiss.IndexFlatIP(max(dim, 1)))
+                entries = {}
+
+            remove = [_faiss_id(i) for i in (delete_ids or [])] + [_faiss_id(i) for i in ids]
+            remove = [fid for fid in remove if fid in entries]
+            if remove:
+                index.remove_ids(np.array(remove, dtype=np.int64))
+                for fid in remove:
+                    entries.pop(fid, None)
+            if arr is not None and len(ids):
+                fids = [_faiss_id(i) for i in ids]
+                index.add_with_ids(arr, np.array(fids, dtype=np.int64))
+                for fid, id_, meta in zip(fids, ids, metadatas):
+                    entries[fid] = (id_, meta)
+
+            # Large stores get an ANN search index, rebuilt (and trained) from the patched flat index
+            index_type = choose_index_type(len(entries), dim)
+            state = _IndexState(
+                index=index,
+                ann=build_ann_index(index, index_type),
+                index_type=index_type,
+                dim=dim,
+                entries=entries,
+                fingerprint=fingerprint if fingerprint is not None else (old.fingerprint if old else ""),
+                embedding_model=embedding_model or (old.embedding_model if old else ""),
+                generation=(old.generation if old else self.generation) + 1,
+            )
+            _save_state(self._key, state)
+            _stores[self._key] = state
+            if _shared():
+                _publish_generation(self._key, state.generation)
+
+    def query(self, vector: np.ndarray, top_k: int = 10, tables: list[str] | None = None) -> list[dict]:
+        """Return top_k matches with id, score, and metadata. vector must be L2-normalized.
+
+        tables restricts the search to chunks of those tables (scored exactly).
+        """
+        state = self._state()
+        if state is None or not state.entries:
             return []
-        arr = np.array([vector], dtype=np.float32)
-        faiss.normalize_L2(arr)
-        scores, indices = self._index.search(arr, min(top_k, len(self._id_list)))
+        arr = np.ascontiguousarray(vector, dtype=np.float32).reshape(1, -1)
+        if tables is not None:
+            return self._query_tables(state, arr[0], top_k, tables)
+        scores, indices = search(state.index, state.ann, arr, min(top_k, len(state.entries)))
         out = []
-        for i, idx in enumerate(indices[0]):
-            if idx < 0:
+        for i, fid in enumerate(indices[0]):
+            entry = state.entries.get(int(fid))
+            if fid < 0 or entry is None:
                 continue
-            id_ = self._id_list[idx]
-            score = float(scores[0][i])
-            meta = self._metadatas[idx] if idx < len(self._metadatas) else {}
-            out.append({"id": id_, "score": score, "metadata": meta})
+            id_, meta = entry
+            out.append({"id": id_, "score": float(scores[0][i]), "metadata": meta})
         return out
+
+    def _query_tables(self, state: _IndexState, vector: np.ndarray, top_k: int, tables: list[str]) -> list[dict]:
+        by_table = state.table_ids()
+        fids = [fid for t in tables for fid in by_table.get(t, [])]
+        if not fids:
+            return []
+        vectors = np.vstack([state.index.reconstruct(fid) for fid in fids])
+        scores = vectors @ vector
+        out = []
+        for i in np.argsort(-scores)[:top_k]:
+            id_, meta = state.entries[fids[i]]
+            out.append({"id": id_, "score": float(scores[i]), "metadata": meta})
+        return out
+
+    def get(self, ids: list[str]) -> list[dict]:
+        """Stored chunks by id (id, metadata; score 0.0), in the given order; unknown ids are skipped."""
+        state = self._state()
+        if state is None:
+            return []
+        out = []
+        for id_ in ids:
+            entry = state.entries.get(_faiss_id(id_))
+            if entry is not None:
+                out.append({"id": id_, "score": 0.0, "metadata": entry[1]})
+        return out
+
+    def score(self, vector: np.ndarray, ids: list[str]) -> dict[str, float]:
+        """Exact inner-product score of vector against each stored id."""
+        state = self._state()
+        if state is None:
+            return {}
+        fids = [(id_, _faiss_id(id_)) for id_ in ids]
+        fids = [(id_, fid) for id_, fid in fids if fid in state.entries]
+        if not fids:
+            return {}
+        vectors = np.vstack([state.index.reconstruct(fid) for _, fid in fids])
+        scores = vectors @ np.asarray(vector, dtype=np.float32).reshape(-1)
+        return {id_: float(s) for (id_, _), s in zip(fids, scores)}
+
+    def table_chunks(self, tables: list[str]) -> list[dict]:
+        """Every stored chunk of these tables (id, metadata; score 0.0), without a vector search."""
+        state = self._state()
+        if state is None:
+            return []
+        by_table = state.table_ids()
+        out = []
+        for t in tables:
+            for fid in by_table.get(t, []):
+                id_, meta = state.entries[fid]
+                out.append({"id": id_, "score": 0.0, "metadata": meta})
+        return out
+
+    @property
+    def index_type(self) -> str:
+        state = self._state()
+        return state.index_type if state else "flat"
+
+    def recall_report(self, index_type: str | None = None, k: int = 10, sample: int = 200) -> dict:
+        """Recall@k / latency of the ANN index against the exact flat index.
+
+        index_type builds a temporary ANN index (e.g. to tune efSearch/nprobe before the store
+        crosses the flat threshold); default is the store's own ANN index.
+        """
+        state = self._state()
+        if state is None or not state.entries:
+            return {"n": 0, "index_type": index_type or "flat"}
+        kind = index_type or state.index_type
+        ann = state.ann if kind == state.index_type else build_ann_index(state.index, kind)
+        if ann is None:
+            return {"n": len(state.entries), "index_type": "flat", "recall_at_k": 1.0}
+        return {"index_type": kind} | recall_report(state.index, ann, k=k, sample=sample)
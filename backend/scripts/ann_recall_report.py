@@ -0,0 +1,74 @@
+"""Recall-vs-latency report for ANN schema indexes against the exact flat index.
+
+Usage (store persisted with VECTOR_STORE_DIR):
+    python scripts/ann_recall_report.py --connection-key <key> --type hnsw --ef 16,32,64,128
+Usage (synthetic vectors, e.g. before a large warehouse is synced):
+    python scripts/ann_recall_report.py --synthetic 50000 --dim 384 --type ivfpq --nprobe 4,8,16,32
+"""
+import argparse
+import json
+import os
+import sys
+
+# Add parent to path so config is importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv(os.path.join(os.path.dirname(os.path.dirname(__file__)), ".env"))
+
+import faiss
+import numpy as np
+
+from config import get_settings
+from schema_ingestion.ann import apply_search_params, build_ann_index, recall_report
+from schema_ingestion.vector_store import FAISSSchemaStore
+
+
+def _synthetic_flat(n: int, dim: int) -> faiss.IndexIDMap2:
+    rng = np.random.default_rng(0)
+    # Clustered data behaves more like real embeddings than uniform noise
+    centers = rng.normal(size=(max(1, n // 50), dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), n)] + rng.normal(0, 0.3, (n, dim)).astype(np.float32)
+    faiss.normalize_L2(vectors)
+    flat = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+    flat.add_with_ids(vectors, np.arange(n, dtype=np.int64))
+    return flat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connection-key", help="Persisted store to report on (needs VECTOR_STORE_DIR)")
+    parser.add_argument("--synthetic", type=int, help="Use N synthetic vectors instead of a store")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--type", choices=["hnsw", "ivfpq"], default="hnsw")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--sample", type=int, default=200)
+    parser.add_argument("--ef", default="", help="Comma-separated efSearch values to sweep (hnsw)")
+    parser.add_argument("--nprobe", default="", help="Comma-separated nprobe values to sweep (ivfpq)")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        flat = _synthetic_flat(args.synthetic, args.dim)
+    elif args.connection_key:
+        store = FAISSSchemaStore(connection_key=args.connection_key)
+        state = store._state()
+        if state is None:
+            print("Store not found. Set VECTOR_STORE_DIR and sync the schema first.")
+            sys.exit(1)
+        flat = state.index
+    else:
+        parser.error("pass --connection-key or --synthetic")
+
+    settings = get_settings()
+    ann = build_ann_index(flat, args.type)
+    knob, values = ("hnsw_ef_search", args.ef) if args.type == "hnsw" else ("ivf_nprobe", args.nprobe)
+    sweep = [int(v) for v in values.split(",") if v.strip()] or [getattr(settings, knob)]
+    for value in sweep:
+        setattr(settings, knob, value)
+        apply_search_params(ann)
+        report = recall_report(flat, ann, k=args.k, sample=args.sample)
+        print(json.dumps({"index_type": args.type, knob: value} | report))
+
+
+if __name__ == "__main__":
+    main()
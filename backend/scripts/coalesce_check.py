@@ -0,0 +1,88 @@
+"""Check single-flight coalescing (in-process, no Redis) with a fast and a slow leader.
+
+N threads call coalesce() with the same key at once.
+- fast: the work finishes within CHAT_COALESCE_TIMEOUT, so it must run exactly once.
+- slow: the work outlasts the timeout. Every follower gives up once, after one timeout, and runs
+  the work itself: runs <= 1 + timeouts, and no caller waits longer than timeout + work (no chain
+  of replacement leaders, each adding another timeout).
+
+Usage:
+    python scripts/coalesce_check.py [--callers 10] [--work 0.5] [--timeout 0.2]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+# Add parent to path so config is importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["REDIS_HOST"] = ""  # in-process only
+
+from config import get_settings
+from singleflight import coalesce
+import metrics
+
+
+def _run(callers: int, work: float) -> tuple[int, float, int]:
+    """(times the work ran, slowest caller's latency, timeouts) for callers concurrent requests."""
+    runs = 0
+    runs_lock = threading.Lock()
+    latencies: list[float] = []
+    start = threading.Barrier(callers)
+    timeouts_before = metrics.snapshot().get("chat_coalesce_timeouts", 0)
+
+    def fn() -> dict:
+        nonlocal runs
+        with runs_lock:
+            runs += 1
+        time.sleep(work)
+        return {"sql": "SELECT 1"}
+
+    def caller() -> None:
+        start.wait()
+        t0 = time.monotonic()
+        coalesce("coalesce-check", fn)
+        latencies.append(time.monotonic() - t0)
+
+    threads = [threading.Thread(target=caller) for _ in range(callers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    timeouts = metrics.snapshot().get("chat_coalesce_timeouts", 0) - timeouts_before
+    return runs, max(latencies), timeouts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--callers", type=int, default=10)
+    parser.add_argument("--work", type=float, default=0.5, help="Seconds the slow leader takes")
+    parser.add_argument("--timeout", type=float, default=0.2, help="CHAT_COALESCE_TIMEOUT for the slow case")
+    args = parser.parse_args()
+
+    s = get_settings()
+    s.chat_coalescing = True
+    slack = 0.1
+    failed = False
+
+    s.chat_coalesce_timeout = args.work * 4
+    runs, slowest, timeouts = _run(args.callers, args.work)
+    ok = runs == 1 and timeouts == 0
+    print(f"fast leader: {args.callers} callers, work ran {runs}x, {timeouts} timeouts, slowest {slowest:.2f}s  {'OK' if ok else 'FAIL'}")
+    failed |= not ok
+
+    s.chat_coalesce_timeout = args.timeout
+    runs, slowest, timeouts = _run(args.callers, args.work)
+    bound = args.timeout + args.work + slack
+    ok = runs <= 1 + timeouts and slowest <= bound
+    print(
+        f"slow leader: {args.callers} callers, work ran {runs}x, {timeouts} timeouts, "
+        f"slowest {slowest:.2f}s (bound {bound:.2f}s)  {'OK' if ok else 'FAIL'}"
+    )
+    failed |= not ok
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Throughput / latency of concurrent single-query embeddings, with and without micro-batching.
+
+Simulates N chat requests each embedding one (uncached) question from its own thread, as the
+FastAPI threadpool does.
+
+Usage:
+    python scripts/embedding_batch_bench.py --concurrency 50 --requests 500
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add parent to path so config is importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv(os.path.join(os.path.dirname(os.path.dirname(__file__)), ".env"))
+
+import numpy as np
+
+from config import get_settings
+from schema_ingestion.embedder import SchemaEmbedder
+from schema_ingestion.model_registry import preload_embedding_model
+
+
+def run(concurrency: int, requests: int, microbatch: bool) -> dict:
+    settings = get_settings()
+    settings.embedding_microbatch = microbatch
+    embedder = SchemaEmbedder()
+    questions = [f"total revenue by customer segment for week {i}" for i in range(requests)]
+    latencies: list[float] = []
+
+    def one(q: str) -> None:
+        t0 = time.perf_counter()
+        embedder._embed_uncached([q])  # bypass the embedding cache
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, questions))
+    elapsed = time.perf_counter() - start
+    return {
+        "microbatch": microbatch,
+        "concurrency": concurrency,
+        "requests": requests,
+        "throughput_rps": round(requests / elapsed, 1),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    if not preload_embedding_model():
+        print("Micro-batching applies to the local (huggingface) embedding provider only.")
+        sys.exit(1)
+    for microbatch in (False, True):
+        print(json.dumps(run(args.concurrency, args.requests, microbatch)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Check that LLM calls reuse pooled keep-alive connections, against a local stub server.
+
+Starts an HTTP/1.1 stub that answers OpenAI-style /v1/chat/completions and Ollama /api/chat,
+counts the TCP connections it accepts, and runs N sync and N async chat calls per provider.
+With the shared clients every batch should need only a handful of connections (1 when serial).
+
+Usage:
+    python scripts/llm_keepalive_check.py [--calls 20]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add parent to path so config is importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import get_settings
+from llm.chat import chat_completion, chat_completion_async
+from llm.clients import close_clients
+
+
+class _Stub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    connections = 0
+    requests = 0
+    _lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with _Stub._lock:
+            _Stub.connections += 1
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with _Stub._lock:
+            _Stub.requests += 1
+        if self.path.endswith("/api/chat"):
+            out = {"message": {"role": "assistant", "content": "ok"}}
+        else:
+            out = {
+                "id": "stub",
+                "object": "chat.completion",
+                "created": 0,
+                "model": body.get("model", "stub"),
+                "choices": [
+                    {"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "ok"}}
+                ],
+            }
+        data = json.dumps(out).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def _measure(label: str, run) -> dict:
+    before_c, before_r = _Stub.connections, _Stub.requests
+    run()
+    return {
+        "case": label,
+        "requests": _Stub.requests - before_r,
+        "connections": _Stub.connections - before_c,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Stub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    s = get_settings()
+    s.openai_api_key = s.openai_api_key or "stub"
+    s.openai_base_url = f"{base}/v1"
+    s.ollama_base_url = base
+    messages = [{"role": "user", "content": "ping"}]
+
+    async def run_async(n: int) -> None:
+        for _ in range(n):
+            await chat_completion_async(messages, model="stub")
+        await close_clients()
+
+    results = []
+    for provider in ("openai", "ollama"):
+        s.llm_provider = provider
+        results.append(_measure(f"{provider} sync", lambda: [chat_completion(messages, model="stub") for _ in range(args.calls)]))
+        results.append(_measure(f"{provider} async", lambda: asyncio.run(run_async(args.calls))))
+    server.shutdown()
+
+    ok = True
+    for r in results:
+        reused = r["connections"] < r["requests"]
+        ok = ok and reused
+        print(json.dumps(r | {"reused": reused}))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
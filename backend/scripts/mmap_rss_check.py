@@ -0,0 +1,105 @@
+"""Check that a persisted flat vector store is memory-mapped on reload, not copied onto the heap.
+
+Builds a synthetic flat store in a temporary VECTOR_STORE_DIR, then reloads and queries it in
+--workers fresh processes at once (like uvicorn/gunicorn workers sharing VECTOR_STORE_DIR) and
+reports, per worker, how much of the index landed in private (anonymous) memory versus file-backed
+pages from the mapping, plus the proportional share (PSS) of those file pages: with the pages
+shared it drops to about index / workers. Fails if any worker's private growth exceeds
+--max-private of the index file. Some private growth is expected either way: the chunk metadata
+(entries) is a Python dict.
+
+Usage:
+    python scripts/mmap_rss_check.py --vectors 100000 --dim 384 --workers 4
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+
+# Add parent to path so config is importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+KEY = "mmap-rss-check"
+
+
+def _memory() -> dict[str, int]:
+    """RssAnon / RssFile / Pss_File of this process in KiB (from /proc/self)."""
+    out = {}
+    for path, names in (("/proc/self/status", ("RssAnon", "RssFile")), ("/proc/self/smaps_rollup", ("Pss_File",))):
+        try:
+            with open(path) as f:
+                for line in f:
+                    name, _, value = line.partition(":")
+                    if name in names:
+                        out[name] = int(value.split()[0])
+        except OSError:
+            pass
+    return out
+
+
+def _load_and_query(store_dir: str, dim: int, barrier, results) -> None:
+    os.environ["VECTOR_STORE_DIR"] = store_dir
+    import numpy as np
+    from schema_ingestion.vector_store import FAISSSchemaStore
+    import faiss  # imported up front so its own footprint is not counted
+
+    before = _memory()
+    store = FAISSSchemaStore(KEY)
+    vector = np.random.default_rng(1).normal(size=dim).astype(np.float32)
+    vector /= np.linalg.norm(vector)
+    store.query(vector, top_k=5)  # loads the store and touches every vector
+    barrier.wait()  # every worker has the index loaded before anyone measures
+    after = _memory()
+    results.put({name: after[name] - before.get(name, 0) for name in after})
+    barrier.wait()  # keep the mapping alive until all workers have measured
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--max-private", type=float, default=0.5, help="Allowed private growth, as a fraction of the index")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as store_dir:
+        os.environ["VECTOR_STORE_DIR"] = store_dir
+        os.environ["VECTOR_INDEX_TYPE"] = "flat"  # only the flat index; ANN structures are heap-resident
+        import numpy as np
+        from schema_ingestion.vector_store import FAISSSchemaStore, store_dir as persisted_dir
+
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(args.vectors, args.dim)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        ids = [f"chunk-{i}" for i in range(args.vectors)]
+        FAISSSchemaStore(KEY).upsert(ids, vectors, [{"table_name": "t"}] * args.vectors)
+        del vectors
+        d = persisted_dir(KEY)
+        index_kib = max(os.path.getsize(os.path.join(d, n)) for n in os.listdir(d) if n.startswith("index-")) // 1024
+
+        ctx = multiprocessing.get_context("spawn")  # fresh process: nothing cached from the build above
+        barrier, results = ctx.Barrier(args.workers), ctx.Queue()
+        procs = [
+            ctx.Process(target=_load_and_query, args=(store_dir, args.dim, barrier, results))
+            for _ in range(args.workers)
+        ]
+        for proc in procs:
+            proc.start()
+        deltas = [results.get() for _ in procs]
+        for proc in procs:
+            proc.join()
+
+    print(f"index file: {index_kib / 1024:.1f} MiB, {args.workers} worker(s)")
+    print(f"{'worker':>6}  {'private MiB':>11}  {'mapped MiB':>10}  {'mapped PSS MiB':>14}")
+    for i, delta in enumerate(deltas):
+        pss = f"{delta['Pss_File'] / 1024:14.1f}" if "Pss_File" in delta else f"{'n/a':>14}"
+        print(f"{i:>6}  {delta['RssAnon'] / 1024:11.1f}  {delta['RssFile'] / 1024:10.1f}  {pss}")
+    if any(delta["RssAnon"] > args.max_private * index_kib for delta in deltas):
+        print("FAIL: the index was copied into private memory instead of being memory-mapped")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
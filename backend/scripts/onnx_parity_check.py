@@ -0,0 +1,107 @@
+"""Parity and speed of the ONNX Runtime embedder against sentence-transformers (PyTorch).
+
+Exports the model on first run (needs optimum), then compares cosine similarity of fp32 and int8
+ONNX vectors with the PyTorch ones on schema-like texts, and reports import time, peak memory and
+per-query latency of each backend (each measured in a fresh subprocess).
+
+Usage:
+    python scripts/onnx_parity_check.py [--model all-MiniLM-L6-v2] [--min-cosine 0.99]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Add parent to path so config is importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+load_dotenv(os.path.join(os.path.dirname(os.path.dirname(__file__)), ".env"))
+
+import numpy as np
+
+TEXTS = [
+    "Table: customers\nColumns: id (INT), name (VARCHAR(255)), email (VARCHAR(255)), created_at (DATETIME)",
+    "Table orders relationships:\n  customer_id references customers(id)",
+    "Table: order_items\nColumns: id (INT), order_id (INT), product_id (INT), quantity (INT), price (DECIMAL)",
+    "how many customers signed up last month",
+    "total revenue by product category in 2023",
+    "top 10 customers by number of orders",
+]
+
+# Runs in a subprocess so import time and memory are those of a cold worker
+_PROBE = r"""
+import json, resource, sys, time
+backend, model, quantize = sys.argv[1], sys.argv[2], sys.argv[3] == "1"
+texts = json.loads(sys.stdin.read())
+t0 = time.perf_counter()
+if backend == "torch":
+    from sentence_transformers import SentenceTransformer
+    import_s = time.perf_counter() - t0
+    encoder = SentenceTransformer(model)
+else:
+    from schema_ingestion.onnx_encoder import OnnxEncoder
+    import onnxruntime, tokenizers
+    import_s = time.perf_counter() - t0
+    encoder = OnnxEncoder(model, quantize=quantize)
+load_s = time.perf_counter() - t0 - import_s
+vectors = encoder.encode(texts, normalize_embeddings=True)
+latencies = []
+for _ in range(5):
+    for t in texts:
+        t1 = time.perf_counter()
+        encoder.encode([t], normalize_embeddings=True)
+        latencies.append((time.perf_counter() - t1) * 1000)
+latencies.sort()
+print(json.dumps({
+    "import_s": round(import_s, 3),
+    "load_s": round(load_s, 3),
+    "query_ms_p50": round(latencies[len(latencies) // 2], 2),
+    "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    "vectors": [[float(x) for x in v] for v in vectors],
+}))
+"""
+
+
+def probe(backend: str, model: str, quantize: bool = False) -> dict:
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE, backend, model, "1" if quantize else "0"],
+        input=json.dumps(TEXTS),
+        capture_output=True,
+        text=True,
+        cwd=backend_dir,
+        env=os.environ | {"PYTHONPATH": backend_dir},
+        check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    from config import get_settings
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=get_settings().embedding_model)
+    parser.add_argument("--min-cosine", type=float, default=0.99)
+    args = parser.parse_args()
+
+    reference = probe("torch", args.model)
+    ref = np.array(reference.pop("vectors"), dtype=np.float32)
+    print(json.dumps({"backend": "torch"} | reference))
+    ok = True
+    for quantize in (False, True):
+        result = probe("onnx", args.model, quantize)
+        vectors = np.array(result.pop("vectors"), dtype=np.float32)
+        cosine = (vectors * ref).sum(axis=1)  # both L2-normalized
+        name = "onnx-int8" if quantize else "onnx"
+        print(json.dumps(
+            {"backend": name, "cosine_min": round(float(cosine.min()), 5), "cosine_mean": round(float(cosine.mean()), 5)}
+            | result
+        ))
+        ok = ok and float(cosine.min()) >= args.min_cosine
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
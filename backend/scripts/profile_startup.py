@@ -0,0 +1,71 @@
+"""Import-time profile of the API process (python -X importtime), with a pass/fail check.
+
+Fails (exit 1) when `import main` pulls in a heavy library the configured providers do not need at
+startup, or when the total import time exceeds --budget-ms. Run it in CI or before a deploy.
+
+Usage:
+    python scripts/profile_startup.py [--top 20] [--budget-ms 1500]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+# Imported lazily (on first use or by the background warm-up); never at `import main`
+DEFERRED = ("faiss", "openai", "groq", "sentence_transformers", "torch", "onnxruntime", "ragas", "langchain")
+
+
+def profile() -> tuple[list[tuple[str, int, int]], float]:
+    """[(module, self_us, cumulative_us)] for top-level and first-level imports, and total ms."""
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        capture_output=True,
+        text=True,
+        cwd=backend_dir,
+        env=os.environ | {"PYTHONPATH": backend_dir},
+    )
+    if proc.returncode != 0:
+        print(proc.stderr)
+        sys.exit(proc.returncode)
+    rows = []
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        name = name.strip()
+        if depth == 0:
+            total_us += int(cumulative_us)
+        rows.append((name, int(self_us), int(cumulative_us)))
+    return rows, total_us / 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=20, help="Slowest modules to list (by cumulative time)")
+    parser.add_argument("--budget-ms", type=float, default=0, help="Fail above this total (0 = no budget)")
+    args = parser.parse_args()
+
+    rows, total_ms = profile()
+    top_level = {name.split(".")[0] for name, _, _ in rows}
+    print(f"import main: {total_ms:.0f} ms, {len(rows)} modules")
+    for name, _, cumulative in sorted(rows, key=lambda r: r[2], reverse=True)[: args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    failed = False
+    eager = [m for m in DEFERRED if m in top_level]
+    if eager:
+        print(f"FAIL: imported at startup (should be lazy): {', '.join(eager)}")
+        failed = True
+    if args.budget_ms and total_ms > args.budget_ms:
+        print(f"FAIL: {total_ms:.0f} ms exceeds the {args.budget_ms:.0f} ms budget")
+        failed = True
+    if not failed:
+        print("OK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
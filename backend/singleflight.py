@@ -0,0 +1,96 @@
+"""Single-flight request coalescing: concurrent identical requests share one execution.
+
+Within a process the first caller for a key (the leader) runs the work; callers arriving while it
+is in flight wait for its result. With Redis configured, the leader also takes a short-lived lock
+key, so leaders in other workers wait for the result it publishes instead of running again.
+A follower waits at most the timeout, measured from its own arrival, and then runs the work itself
+without taking over the flight: a slow leader costs each caller at most one timeout, and callers
+never queue behind a chain of replacement leaders. The same applies to a follower whose leader in
+another worker fails.
+"""
+from __future__ import annotations
+import threading
+import time
+import uuid
+from typing import Callable
+from cache import flight_lock_acquire, flight_lock_owner, flight_lock_release, flight_result_get, flight_result_set
+from config import get_settings
+import metrics
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: dict | None = None
+        self.error: BaseException | None = None
+
+
+_calls: dict[str, _Call] = {}
+_lock = threading.Lock()
+
+
+def coalesce(key: str, fn: Callable[[], dict]) -> dict:
+    """Run fn once for all concurrent callers with the same key; returns its (JSON-serializable) result."""
+    s = get_settings()
+    if not s.chat_coalescing:
+        return fn()
+    with _lock:
+        call = _calls.get(key)
+        leader = call is None
+        if leader:
+            call = _calls[key] = _Call()
+    if not leader:
+        if call.done.wait(s.chat_coalesce_timeout):
+            if call.error is not None:
+                raise call.error
+            metrics.incr("chat_coalesced")
+            return call.result
+        # Slow leader: run on our own, but leave the flight registered so later callers still join it
+        metrics.incr("chat_coalesce_timeouts")
+        return fn()
+    try:
+        call.result = _run_across_workers(key, fn)
+        return call.result
+    except BaseException as e:
+        call.error = e
+        raise
+    finally:
+        with _lock:
+            if _calls.get(key) is call:
+                del _calls[key]
+        call.done.set()
+
+
+def _run_across_workers(key: str, fn: Callable[[], dict]) -> dict:
+    """Take the Redis lock and run fn, or wait for the worker holding it. Without Redis just run fn.
+
+    The result is published under the leader's lock token, so a follower only ever picks up the
+    result of the flight it waited on, never one left over from an earlier flight.
+    """
+    s = get_settings()
+    token = uuid.uuid4().hex
+    acquired = flight_lock_acquire(key, token, s.chat_coalesce_lock_ttl)
+    if acquired is None:  # no Redis
+        return fn()
+    if acquired:
+        try:
+            result = fn()
+            flight_result_set(key, token, result)
+            return result
+        finally:
+            flight_lock_release(key, token)
+    leader = flight_lock_owner(key)
+    deadline = time.monotonic() + s.chat_coalesce_timeout
+    while leader is not None and time.monotonic() < deadline:
+        time.sleep(s.chat_coalesce_poll_ms / 1000)
+        owner = flight_lock_owner(key)  # read before the result: the leader publishes, then unlocks
+        result = flight_result_get(key, leader)
+        if result is not None:
+            metrics.incr("chat_coalesced_remote")
+            return result
+        if owner != leader:
+            break  # leader finished without a result (failed) or its lock expired
+    else:
+        if leader is not None:
+            metrics.incr("chat_coalesce_timeouts")
+    return fn()
@@ -1,6 +1,11 @@
 """Phase 3: SQL generation with validation (syntax, tables, read-only, row limit)."""
-from .generator import SQLGenerator
-from .validator import SQLValidator
-from .pipeline import SQLGenerationPipeline
+from lazy import lazy_exports
 
-__all__ = ["SQLGenerator", "SQLValidator", "SQLGenerationPipeline"]
+__getattr__, __all__ = lazy_exports(
+    __name__,
+    {
+        "SQLGenerator": ".generator",
+        "SQLValidator": ".validator",
+        "SQLGenerationPipeline": ".pipeline",
+    },
+)
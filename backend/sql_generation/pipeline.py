@@ -1,10 +1,18 @@
 """Phase 3 pipeline: NL -> intent + retrieval -> generate SQL -> validate."""
 from __future__ import annotations
-from query_understanding.intent import QueryUnderstanding
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import metrics
+from query_understanding.intent import QueryIntent, QueryUnderstanding
 from query_understanding.retriever import SchemaRetriever
 from sql_generation.generator import SQLGenerator
+from sql_generation.semantic_cache import get_semantic_cache, logger as cache_logger, normalize_sql
+from sql_generation.template_cache import find_template, learn_template
 from sql_generation.validator import SQLValidator
-from schema_ingestion.extractor import SchemaExtractor
+from schema_ingestion.catalog import get_schema_catalog
 from config import get_settings
 from connection import ConnectionConfig, get_connection
 
@@ -20,24 +28,112 @@ def _wants_tables_separately(user_query: str) -> bool:
     return (separately or no_joins) and (all_tables or "table" in q)
 
 
+@contextmanager
+def _timed(timings: dict[str, float], stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = round((time.perf_counter() - start) * 1000, 2)
+
+
+def _merge_chunks(first: list[dict], second: list[dict]) -> list[dict]:
+    """Union by chunk id (best score wins), highest score first."""
+    best: dict[str, dict] = {}
+    for c in first + second:
+        if c["id"] not in best or c["score"] > best[c["id"]]["score"]:
+            best[c["id"]] = c
+    return sorted(best.values(), key=lambda c: c["score"], reverse=True)
+
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+_request_threads = 40  # anyio's default thread limit, which runs FastAPI's sync routes
+
+
+def set_request_concurrency(threads: int) -> None:
+    """Record how many requests the server runs at once (app startup); sizes the intent pool."""
+    global _request_threads
+    _request_threads = threads
+
+
+_audit_executor: ThreadPoolExecutor | None = None
+
+
+def _get_audit_executor() -> ThreadPoolExecutor:
+    """Background semantic cache audits. Separate from the intent pool: an audit runs the pipeline,
+    which waits on intent futures, so sharing that pool could exhaust it."""
+    global _audit_executor
+    if _audit_executor is None:
+        with _executor_lock:
+            if _audit_executor is None:
+                _audit_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-audit")
+    return _audit_executor
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Shared pool for intent calls that run alongside retrieval (concurrent pipeline mode).
+
+    One thread per concurrent request by default, so intent calls never queue behind each other.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = get_settings().pipeline_workers or _request_threads
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pipeline")
+    return _executor
+
+
 class SQLGenerationPipeline:
     """End-to-end: user query -> validated SQL."""
 
     def __init__(self, connection_config: ConnectionConfig | None = None):
         conn = get_connection(connection_config)
         self.conn = conn
-        self.understanding = QueryUnderstanding()
+        self.understanding = QueryUnderstanding(connection_key=conn.connection_key())
         self.retriever = SchemaRetriever(connection_key=conn.connection_key(), top_k=10)
         self.generator = SQLGenerator()
         self.validator = SQLValidator(connection_config=conn)
         self.settings = get_settings()
 
-    def run(self, user_query: str) -> dict:
-        """Return { sql, valid, error, intent, context_used, sql_list? }."""
-        intent = self.understanding.understand(user_query)
+    def run(self, user_query: str, use_semantic_cache: bool = True) -> dict:
+        """Return { sql, valid, error, intent, context_used, sql_list?, timings, semantic_cache?, template_cache? }.
+
+        PIPELINE_MODE=concurrent retrieves on the raw question while the intent LLM call is in
+        flight, then merges in hits for the intent summary; serial retrieves on "summary + question"
+        after the intent call. timings holds per-stage milliseconds.
+        With SEMANTIC_CACHE on, a paraphrase of an earlier question reuses its SQL and validation
+        result (no intent, retrieval or generation); semantic_cache then holds the match.
+        With TEMPLATE_CACHE on, a question that differs from an earlier one only in constants reuses
+        its parameterized SQL: sql is then for display, execute sql_template with params.
+        """
+        timings: dict[str, float] = {}
+        start = time.perf_counter()
+        separate = _wants_tables_separately(user_query)
+        chunks = None
+        cache_vector = None
+        if use_semantic_cache and self.settings.template_cache and not separate:
+            with _timed(timings, "template_cache_ms"):
+                found = find_template(self.conn.connection_key(), self._generation(), user_query)
+            if found is not None:
+                return self._from_template(*found, timings, start)
+        if use_semantic_cache and self.settings.semantic_cache and not separate:
+            with _timed(timings, "semantic_cache_ms"):
+                cache_vector = self.retriever.embedder.embed_texts([user_query])[0]
+                hit = get_semantic_cache(self.conn.connection_key()).lookup(
+                    user_query, cache_vector, self._generation(), self.settings.semantic_cache_threshold
+                )
+            if hit is not None:
+                return self._from_cache(user_query, *hit, timings, start)
+            metrics.incr("semantic_cache_misses")
+        if self.settings.pipeline_mode == "concurrent" and not separate:
+            intent, chunks = self._understand_and_retrieve(user_query, timings)
+        else:
+            intent = self._understand(user_query, timings)
 
         # When user wants "all tables separately, no joins" -> one SELECT per table
-        if _wants_tables_separately(user_query):
+        if separate:
             sql_list = self._generate_separate_table_queries()
             if sql_list:
                 sql_display = ";\n\n".join(sql_list)
@@ -50,24 +146,35 @@ class SQLGenerationPipeline:
                         "intent": intent.intent,
                         "entities": intent.entities,
                         "summary": intent.summary,
+                        "source": intent.source,
+                        "confidence": intent.confidence,
                     },
                     "context_used": "",
+                    "timings": timings | {"total_ms": round((time.perf_counter() - start) * 1000, 2)},
                 }
         # Normal single-query path
-        retrieval_query = f"{intent.summary} {user_query}"
-        schema_context = self.retriever.get_context_for_prompt(retrieval_query)
-        sql = self.generator.generate(user_query, schema_context)
+        if chunks is None:
+            with _timed(timings, "retrieval_ms"):
+                chunks = self.retriever.retrieve(f"{intent.summary} {user_query}")
+        packed = self.retriever.pack(chunks)
+        schema_context = packed.text
+        with _timed(timings, "generation_ms"):
+            sql = self.generator.generate(user_query, schema_context)
 
         # Enforce LIMIT if missing
+        added_limit = False
         if self.settings.max_rows_limit and "LIMIT" not in sql.upper() and "SELECT" in sql.upper():
+            added_limit = True
             sql = sql.rstrip()
             if not sql.rstrip().endswith(";"):
                 sql = sql + f" LIMIT {self.settings.max_rows_limit}"
             else:
                 sql = sql[:-1].rstrip() + f" LIMIT {self.settings.max_rows_limit};"
 
-        valid, err = self.validator.validate(sql)
-        return {
+        with _timed(timings, "validation_ms"):
+            valid, err = self.validator.validate(sql)
+        timings["total_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        out = {
             "sql": sql,
             "valid": valid,
             "error": err,
@@ -75,20 +182,109 @@ class SQLGenerationPipeline:
                 "intent": intent.intent,
                 "entities": intent.entities,
                 "summary": intent.summary,
+                "source": intent.source,
+                "confidence": intent.confidence,
             },
             "context_used": schema_context[:500] + "..." if len(schema_context) > 500 else schema_context,
+            "context_tokens": packed.tokens,
+            "context_tokens_saved": packed.tokens_saved,
+            "timings": timings,
+        }
+        if cache_vector is not None and valid:
+            cached = {k: v for k, v in out.items() if k != "timings"}
+            get_semantic_cache(self.conn.connection_key()).add(user_query, cache_vector, cached, self._generation())
+        if use_semantic_cache and self.settings.template_cache and valid:
+            learn_template(
+                self.conn.connection_key(), self._generation(), user_query, sql, out["intent"], added_limit
+            )
+        return out
+
+    def _generation(self) -> tuple[int, int]:
+        """Schema version the semantic cache is tied to; bumped by every re-sync that changes vectors."""
+        return self.retriever.store.generation, self.retriever.column_store.generation
+
+    def _from_cache(self, user_query: str, entry, score: float, timings: dict[str, float], start: float) -> dict:
+        """Pipeline output for a semantic cache hit; samples the hit for a background audit."""
+        metrics.incr("semantic_cache_hits")
+        cache_logger.info(
+            "semantic cache hit (%.3f): %r -> cached %r", score, user_query, entry.question
+        )
+        if random.random() < self.settings.semantic_cache_audit_rate:
+            _get_audit_executor().submit(self._audit, user_query, entry, score)
+        timings["total_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        out = dict(entry.result)
+        out["intent"] = dict(out["intent"], source="cache")
+        return out | {
+            "timings": timings,
+            "semantic_cache": {"hit": True, "score": round(score, 4), "question": entry.question},
         }
 
+    def _from_template(self, template, params: dict, timings: dict[str, float], start: float) -> dict:
+        """Pipeline output for a template hit: the validated template with this question's values bound."""
+        timings["total_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        return {
+            "sql": template.render(params),
+            "sql_template": template.sql,
+            "params": params,
+            "valid": True,
+            "error": "",
+            "intent": dict(template.intent, source="template"),
+            "context_used": "",
+            "timings": timings,
+            "template_cache": {"hit": True, "question": template.question},
+        }
+
+    def _audit(self, user_query: str, entry, score: float) -> None:
+        """Regenerate SQL for a cache hit without the cache; on a mismatch log it and drop the entry."""
+        metrics.incr("semantic_cache_audits")
+        try:
+            fresh = self.run(user_query, use_semantic_cache=False)
+        except Exception as e:
+            cache_logger.warning("semantic cache audit failed for %r: %s", user_query, e)
+            return
+        if normalize_sql(fresh["sql"]) == normalize_sql(entry.result["sql"]):
+            cache_logger.info("semantic cache audit ok (%.3f): %r ~ %r", score, user_query, entry.question)
+            return
+        metrics.incr("semantic_cache_false_hits")
+        cache_logger.warning(
+            "semantic cache audit mismatch (%.3f): %r reused SQL of %r\n  cached: %s\n  fresh:  %s",
+            score, user_query, entry.question, entry.result["sql"], fresh["sql"],
+        )
+        get_semantic_cache(self.conn.connection_key()).remove(entry)
+
+    def _understand(self, user_query: str, timings: dict[str, float]) -> QueryIntent:
+        """Intent per INTENT_MODE: local classifier with LLM fallback, LLM only, or (skip) the question as summary."""
+        if self.settings.intent_mode == "skip":
+            return QueryIntent(intent="SELECT", entities=[], conditions=[], summary=user_query, source="skip")
+        with _timed(timings, "intent_ms"):
+            return self.understanding.understand(user_query)
+
+    def _understand_and_retrieve(self, user_query: str, timings: dict[str, float]) -> tuple[QueryIntent, list[dict]]:
+        """Intent (worker thread) and raw-question retrieval (this thread) in parallel."""
+        start = time.perf_counter()
+        future = None
+        if self.settings.intent_mode != "skip":
+            future = _get_executor().submit(self._understand, user_query, timings)
+        with _timed(timings, "retrieval_ms"):
+            chunks = self.retriever.retrieve(user_query)
+        intent = future.result() if future is not None else self._understand(user_query, timings)
+        parallel_ms = (time.perf_counter() - start) * 1000
+        if intent.summary.strip().lower() != user_query.strip().lower():
+            with _timed(timings, "summary_retrieval_ms"):
+                chunks = _merge_chunks(chunks, self.retriever.retrieve(intent.summary))
+        # Time the serial order would have spent on intent + retrieval beyond the overlapped wall time
+        serial_ms = timings.get("intent_ms", 0.0) + timings["retrieval_ms"]
+        timings["overlap_saved_ms"] = round(max(serial_ms - parallel_ms, 0.0), 2)
+        return intent, chunks
+
     def _generate_separate_table_queries(self) -> list[str]:
-        """One SELECT per table, no joins. Use Redis cache for table list if available."""
+        """One SELECT per table, no joins. Table list from Redis cache, else the schema catalog."""
         from cache import schema_tables_get
         limit = self.settings.max_rows_limit or 1000
         is_pg = self.conn.database_type == "postgres"
         table_names = schema_tables_get(self.conn.connection_key())
         if not table_names:
-            extractor = SchemaExtractor(connection_config=self.conn)
-            schema = extractor.extract()
-            table_names = [t.name for t in schema.tables]
+            table_names = get_schema_catalog().table_names(self.conn)
         out = []
         for name in table_names:
             quoted = f'"{name}"' if is_pg else f"`{name}`"
@@ -0,0 +1,142 @@
+"""Semantic NL -> SQL cache per connection: paraphrased questions reuse previously generated SQL.
+
+Question embeddings live in a small in-memory FAISS index per connection key. A lookup hits when
+the nearest cached question is within SEMANTIC_CACHE_THRESHOLD (cosine) and mentions the same
+literals (numbers, dates, quoted and enum values, as extracted for SQL templates), so "top 5" never
+reuses the SQL for "top 10". The cache is tied to the vector store generation: a re-sync of that
+connection drops its entries. A sample of hits is audited by regenerating the SQL in the
+background; a mismatch is logged and the entry that produced it is dropped.
+"""
+from __future__ import annotations
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+import numpy as np
+from config import get_settings
+from lazy import lazy_import
+from sql_generation.template_cache import enum_values, extract_literals
+import metrics
+
+faiss = lazy_import("faiss")
+logger = logging.getLogger(__name__)
+
+
+def question_literals(connection_key: str, question: str) -> tuple[tuple[str, str], ...]:
+    """Sorted (kind, value) of the question's literals; paraphrases must agree on all of them."""
+    _, literals = extract_literals(question, enum_values(connection_key))
+    return tuple(sorted((lit.kind, str(lit.value).lower()) for lit in literals))
+
+
+def normalize_sql(sql: str) -> str:
+    """Whitespace/case/trailing-semicolon insensitive form, for audits."""
+    return re.sub(r"\s+", " ", sql.strip().rstrip(";")).lower()
+
+
+@dataclass
+class CachedSQL:
+    id: int
+    question: str
+    literals: tuple[tuple[str, str], ...]
+    result: dict  # pipeline output: sql, valid, error, intent, sql_list?, ...
+    created_at: float = field(default_factory=time.time)
+    hits: int = 0
+
+
+class SemanticSQLCache:
+    """One connection's cache; entries are valid for a single vector store generation."""
+
+    def __init__(self, connection_key: str, maxsize: int):
+        self.connection_key = connection_key
+        self.maxsize = maxsize
+        self.generation: tuple[int, int] | None = None  # (table store, column store) generations
+        self.index = None  # faiss.IndexIDMap2 over IndexFlatIP, created with the first entry
+        self.entries: dict[int, CachedSQL] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def _reset(self, generation: tuple[int, int]) -> None:
+        if self.entries:
+            logger.info("semantic cache: dropping %d entries (store generation %s -> %s)",
+                        len(self.entries), self.generation, generation)
+        self.generation = generation
+        self.index = None
+        self.entries = {}
+
+    def lookup(self, question: str, vector: np.ndarray, generation: tuple[int, int], threshold: float) -> tuple[CachedSQL, float] | None:
+        """Best cached entry for question if within threshold and with the same literals."""
+        with self._lock:
+            if generation != self.generation:
+                self._reset(generation)
+            if self.index is None or not self.entries or self.index.d != vector.shape[0]:
+                return None
+            k = min(5, len(self.entries))
+            scores, ids = self.index.search(np.ascontiguousarray(vector, dtype=np.float32).reshape(1, -1), k)
+            literals = question_literals(self.connection_key, question)
+            for score, id_ in zip(scores[0], ids[0]):
+                entry = self.entries.get(int(id_))
+                if entry is None or score < threshold:
+                    break
+                if entry.literals == literals:
+                    entry.hits += 1
+                    return entry, float(score)
+        return None
+
+    def add(self, question: str, vector: np.ndarray, result: dict, generation: tuple[int, int]) -> None:
+        with self._lock:
+            if generation != self.generation:
+                self._reset(generation)
+            dim = vector.shape[0]
+            if self.index is None or self.index.d != dim:
+                self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+                self.entries = {}
+            if len(self.entries) >= self.maxsize:
+                oldest = min(self.entries)  # ids increase with insertion order
+                self.index.remove_ids(np.array([oldest], dtype=np.int64))
+                del self.entries[oldest]
+            id_ = self._next_id
+            self._next_id += 1
+            self.index.add_with_ids(
+                np.ascontiguousarray(vector, dtype=np.float32).reshape(1, -1), np.array([id_], dtype=np.int64)
+            )
+            self.entries[id_] = CachedSQL(
+                id=id_, question=question, literals=question_literals(self.connection_key, question), result=result
+            )
+
+    def remove(self, entry: CachedSQL) -> bool:
+        """Drop entry (e.g. after a failed audit); False if it is already gone."""
+        with self._lock:
+            if self.entries.get(entry.id) is not entry:
+                return False
+            self.index.remove_ids(np.array([entry.id], dtype=np.int64))
+            del self.entries[entry.id]
+            return True
+
+
+_caches: dict[str, SemanticSQLCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_semantic_cache(connection_key: str) -> SemanticSQLCache:
+    cache = _caches.get(connection_key)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.setdefault(connection_key, SemanticSQLCache(connection_key, get_settings().semantic_cache_size))
+    return cache
+
+
+def semantic_cache_stats() -> dict:
+    snap = metrics.snapshot()
+    hits = snap.get("semantic_cache_hits", 0)
+    lookups = hits + snap.get("semantic_cache_misses", 0)
+    audits = snap.get("semantic_cache_audits", 0)
+    return {
+        "connections": len(_caches),
+        "entries": sum(len(c.entries) for c in list(_caches.values())),
+        "hits": hits,
+        "lookups": lookups,
+        "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        "audits": audits,
+        "false_hits": snap.get("semantic_cache_false_hits", 0),
+    }
@@ -0,0 +1,326 @@
+"""Literal-agnostic SQL templates: questions that differ only in constants reuse one validated SQL.
+
+Literals (quoted strings, numbers, years, ISO dates, "March 2024", known enum values) are cut out
+of the question; what remains ("orders in <month>") keys a template. A template is learned from a
+validated generation by replacing the SQL constants that render the question's literals with bind
+parameters (:p0_value, :p1_start, ...). A later question with the same shape binds its own values
+and skips generation. The values reach the driver as parameters and are quoted there, never
+spliced into the SQL text here (pymysql and psycopg2 still inline them client-side).
+
+A question is not templated when a literal could have produced more than one constant, or when it
+matches a constant that is part of the query's structure (the enforced LIMIT, a function argument,
+an INTERVAL), since binding there would change the query rather than its filter values.
+"""
+from __future__ import annotations
+import calendar
+import re
+from dataclasses import dataclass
+from datetime import date
+from typing import Any
+from schema_ingestion.catalog import get_schema_catalog
+from config import get_settings
+from lru import LRUCache
+import metrics
+
+_MONTHS = {m.lower(): i for i, m in enumerate(calendar.month_name) if m}
+_MONTHS |= {m.lower(): i for i, m in enumerate(calendar.month_abbr) if m} | {"sept": 9}
+
+_LITERAL = re.compile(
+    r"(?P<string>'[^']*'|\"[^\"]*\")"
+    r"|(?P<date>\b\d{4}-\d{2}-\d{2}\b)"
+    rf"|(?P<month>\b(?:{'|'.join(sorted(_MONTHS, key=len, reverse=True))})\.?\s+\d{{4}}\b)"
+    r"|(?P<number>(?<![\w.])\d+(?:\.\d+)?(?![\w.]))"
+    r"|(?P<word>\b[a-z][\w-]*\b)",
+    re.IGNORECASE,
+)
+# SQL constants: quoted strings and bare numbers; quoted identifiers are matched only to skip them
+_SQL_TOKEN = re.compile(r"(?P<ident>\"[^\"]*\"|`[^`]*`)|(?P<string>'(?:[^']|'')*')|(?P<number>(?<![\w.$:])\d+(?:\.\d+)?(?![\w.]))")
+# Words before "(" that open a sub-expression rather than a function call
+_NOT_CALLS = {
+    "IN", "VALUES", "EXISTS", "AND", "OR", "NOT", "ON", "WHERE", "SELECT", "FROM", "JOIN", "AS", "HAVING",
+    "WHEN", "THEN", "ELSE", "BY", "ALL", "ANY", "SOME", "USING", "OVER", "BETWEEN", "LIMIT", "OFFSET",
+}
+_ENUM_TYPE = re.compile(r"^\s*enum\s*\((.*)\)\s*$", re.IGNORECASE | re.DOTALL)
+
+
+@dataclass
+class Literal:
+    kind: str  # string | date | month | year | number | enum
+    text: str  # as written in the question
+    value: Any  # str, int/float, or (year, month) for month
+
+    def renderings(self) -> dict[str, Any]:
+        """Values this literal can appear as in SQL, by name (the bind-parameter suffix)."""
+        if self.kind == "year":
+            y = self.value
+            return {"value": y, "start": f"{y}-01-01", "end": f"{y + 1}-01-01", "last": f"{y}-12-31"}
+        if self.kind == "month":
+            y, m = self.value
+            nxt = date(y + m // 12, m % 12 + 1, 1)
+            return {
+                "start": date(y, m, 1).isoformat(),
+                "end": nxt.isoformat(),
+                "last": date(y, m, calendar.monthrange(y, m)[1]).isoformat(),
+                "ym": f"{y}-{m:02d}",
+                "year": y,
+                "month": m,
+            }
+        return {"value": self.value}
+
+
+@dataclass
+class Binding:
+    literal: int  # index into the question's literals
+    rendering: str  # key of Literal.renderings()
+    as_text: bool  # the SQL had a quoted string here (bind str) rather than a bare number
+    case: str = ""  # upper | lower: enum values re-cased like the SQL they replaced
+    in_limit: bool = False  # LIMIT/OFFSET operand: checked against MAX_ROWS_LIMIT when bound
+
+
+@dataclass
+class SQLTemplate:
+    key: str
+    question: str  # the question the template was learned from
+    sql: str  # with :name bind parameters
+    bindings: dict[str, Binding]
+    intent: dict
+    hits: int = 0
+    created_from: str = ""  # the validated SQL it was derived from
+
+    def bind(self, literals: list[Literal]) -> dict[str, Any] | None:
+        """Bind parameters for a question with this template's shape; None if a value is not allowed."""
+        params: dict[str, Any] = {}
+        for name, b in self.bindings.items():
+            value = literals[b.literal].renderings().get(b.rendering)
+            if value is None:
+                return None
+            if b.in_limit and (not isinstance(value, int) or value > get_settings().max_rows_limit):
+                return None  # let generation + validation handle an out-of-range LIMIT
+            if b.as_text:
+                value = str(value)
+                value = value.upper() if b.case == "upper" else value.lower() if b.case == "lower" else value
+            params[name] = value
+        return params
+
+    def render(self, params: dict[str, Any]) -> str:
+        """SQL with the values inlined, for display only; execution binds params."""
+
+        def literal(m: re.Match) -> str:
+            value = params[m.group(1)]
+            return "'" + value.replace("'", "''") + "'" if isinstance(value, str) else str(value)
+
+        return re.sub(r"(?<![:\w]):(p\d+_\w+)", literal, self.sql)
+
+
+# (connection key, store generations, template key) -> SQLTemplate; a re-sync changes the generations
+_templates: LRUCache | None = None
+_enums: dict[str, tuple[int, dict[str, tuple[str, str]]]] = {}
+
+
+def _template_cache() -> LRUCache:
+    global _templates
+    if _templates is None:
+        _templates = LRUCache(maxsize=get_settings().template_cache_size)
+    return _templates
+
+
+def template_cache_stats() -> dict:
+    snap = metrics.snapshot()
+    return _template_cache().stats() | {
+        "learned": snap.get("template_cache_learned", 0),
+        "not_templatable": snap.get("template_cache_not_templatable", 0),
+    }
+
+
+def enum_values(connection_key: str) -> dict[str, tuple[str, str]]:
+    """lower-cased enum value -> (value as declared, slot name) from ENUM column types of the synced schema.
+
+    The slot names the column(s) holding the value, so "active users" (status) and "admin users"
+    (role) never share a template.
+    """
+    entry = get_schema_catalog().peek(connection_key)
+    if entry is None:
+        return {}
+    cached = _enums.get(connection_key)
+    if cached is not None and cached[0] == entry.version:
+        return cached[1]
+    columns: dict[str, set[str]] = {}
+    declared: dict[str, str] = {}
+    for table in entry.schema.tables:
+        for col in table.columns:
+            m = _ENUM_TYPE.match(col.type)
+            if not m:
+                continue
+            for value in re.findall(r"'((?:[^']|'')*)'", m.group(1)):
+                if re.fullmatch(r"[a-z][\w-]*", value, re.IGNORECASE):
+                    declared.setdefault(value.lower(), value)
+                    columns.setdefault(value.lower(), set()).add(col.name.lower())
+    values = {v: (declared[v], "enum:" + "|".join(sorted(cols))) for v, cols in columns.items()}
+    _enums[connection_key] = (entry.version, values)
+    return values
+
+
+def extract_literals(question: str, enums: dict[str, tuple[str, str]] | None = None) -> tuple[str, list[Literal]]:
+    """(template key, literals in question order). The key is the question with <kind> slots."""
+    enums = enums or {}
+    literals: list[Literal] = []
+    parts: list[str] = []
+    pos = 0
+    for m in _LITERAL.finditer(question):
+        kind, text = m.lastgroup, m.group()
+        if kind == "word":
+            if text.lower() not in enums:
+                continue
+            value, slot = enums[text.lower()]
+            literals.append(Literal("enum", text, value))
+        elif kind == "string":
+            literals.append(Literal("string", text, text[1:-1]))
+            slot = "string"
+        elif kind == "date":
+            literals.append(Literal("date", text, text))
+            slot = "date"
+        elif kind == "month":
+            name, year = text.split()
+            literals.append(Literal("month", text, (int(year), _MONTHS[name.rstrip(".").lower()])))
+            slot = "month"
+        elif "." not in text and 1900 <= int(text) <= 2099:
+            literals.append(Literal("year", text, int(text)))
+            slot = "year"
+        else:
+            literals.append(Literal("number", text, float(text) if "." in text else int(text)))
+            slot = "number"
+        parts += [question[pos:m.start()], f"<{slot}>"]
+        pos = m.end()
+    parts.append(question[pos:])
+    key = re.sub(r"\s+", " ", "".join(parts).lower()).strip(" ?.!")
+    return key, literals
+
+
+def _matches(token_kind: str, token: str, literal: Literal, value: Any) -> bool:
+    if token_kind == "number":
+        if isinstance(value, str):
+            return False
+        return token == literal.text if literal.kind == "number" else token.isdigit() and int(token) == value
+    inner = token[1:-1].replace("''", "'")
+    if literal.kind in ("string", "enum"):
+        return inner.lower() == str(value).lower()
+    return inner == str(value) if isinstance(value, str) else literal.kind in ("number", "year") and inner == literal.text
+
+
+def _call_arguments(sql: str) -> list[tuple[int, int]]:
+    """(start, end) spans of function-call argument lists, e.g. the "price, 2" of ROUND(price, 2)."""
+    spans: list[tuple[int, int]] = []
+    stack: list[tuple[int, bool]] = []
+    for m in re.finditer(r"'(?:[^']|'')*'|\"[^\"]*\"|`[^`]*`|\(|\)", sql):
+        if m.group() == "(":
+            word = re.search(r"([A-Za-z_][\w.]*)\s*$", sql[:m.start()])
+            stack.append((m.end(), bool(word) and word.group(1).upper() not in _NOT_CALLS))
+        elif m.group() == ")" and stack:
+            start, is_call = stack.pop()
+            if is_call:
+                spans.append((start, m.start()))
+    return spans
+
+
+def _structural(sql: str, start: int, calls: list[tuple[int, int]], added_limit: tuple[int, int] | None) -> bool:
+    """True if the constant at start belongs to the query's shape rather than to a filter value."""
+    if added_limit and added_limit[0] <= start < added_limit[1]:
+        return True
+    if re.search(r"\bINTERVAL\s*$", sql[:start], re.IGNORECASE):
+        return True
+    return any(a <= start < b for a, b in calls)
+
+
+def build_template(
+    question: str,
+    sql: str,
+    intent: dict,
+    enums: dict[str, tuple[str, str]] | None = None,
+    added_limit: bool = False,
+) -> SQLTemplate | None:
+    """Parameterize validated SQL for question; None unless every literal maps to SQL constants unambiguously.
+
+    added_limit: the trailing LIMIT was appended by the pipeline (MAX_ROWS_LIMIT), not generated.
+    """
+    key, literals = extract_literals(question, enums)
+    if not literals:
+        return None
+    renderings = [lit.renderings() for lit in literals]
+    calls = _call_arguments(sql)
+    limit = re.search(r"\bLIMIT\s+\d+\s*;?\s*$", sql, re.IGNORECASE) if added_limit else None
+    limit_span = limit.span() if limit else None
+    bindings: dict[str, Binding] = {}
+    used: set[int] = set()
+    out: list[str] = []
+    pos = 0
+    for m in _SQL_TOKEN.finditer(sql):
+        kind = m.lastgroup
+        if kind == "ident":
+            continue
+        token = m.group()
+        found = [
+            (i, name)
+            for i, lit in enumerate(literals)
+            for name, value in renderings[i].items()
+            if _matches(kind, token, lit, value)
+        ]
+        if not found:
+            continue  # a constant of the query itself (e.g. the enforced LIMIT)
+        if len({i for i, _ in found}) > 1:
+            return None  # the same constant could come from two literals
+        if _structural(sql, m.start(), calls, limit_span):
+            return None  # e.g. "above 1000" vs the enforced LIMIT 1000, "top 2" vs ROUND(x, 2)
+        i, name = found[0]
+        bind = f"p{i}_{name}"
+        if bind in bindings:
+            return None  # one literal value appears as several constants: which one it set is unknown
+        case = ""
+        if kind == "string" and literals[i].kind == "enum":
+            inner = token[1:-1]
+            case = "upper" if inner.isupper() else "lower" if inner.islower() else ""
+        before = sql[:m.start()].rstrip().upper()
+        bindings[bind] = Binding(
+            literal=i,
+            rendering=name,
+            as_text=kind == "string",
+            case=case,
+            in_limit=before.endswith("LIMIT") or before.endswith("OFFSET"),
+        )
+        used.add(i)
+        # "(:p)" when a cast follows, so "::date" is not read as part of the bind name
+        placeholder = f"(:{bind})" if sql[m.end():m.end() + 1] == ":" else f":{bind}"
+        out += [sql[pos:m.start()], placeholder]
+        pos = m.end()
+    if len(used) < len(literals):
+        return None  # a literal the SQL does not show would be silently ignored on reuse
+    out.append(sql[pos:])
+    return SQLTemplate(key=key, question=question, sql="".join(out), bindings=bindings, intent=intent, created_from=sql)
+
+
+def find_template(connection_key: str, generation: tuple, question: str) -> tuple[SQLTemplate, dict[str, Any]] | None:
+    """(template, bind params) for question, or None."""
+    key, literals = extract_literals(question, enum_values(connection_key))
+    if not literals:
+        return None
+    template = _template_cache().get((connection_key, generation, key))
+    if template is None:
+        return None
+    params = template.bind(literals)
+    if params is None:
+        return None
+    template.hits += 1
+    return template, params
+
+
+def learn_template(
+    connection_key: str, generation: tuple, question: str, sql: str, intent: dict, added_limit: bool = False
+) -> SQLTemplate | None:
+    """Derive and store a template from SQL that passed SQLValidator for question."""
+    template = build_template(question, sql, intent, enum_values(connection_key), added_limit)
+    if template is None:
+        if extract_literals(question)[1]:
+            metrics.incr("template_cache_not_templatable")
+        return None
+    _template_cache().put((connection_key, generation, template.key), template)
+    metrics.incr("template_cache_learned")
+    return template
@@ -2,7 +2,7 @@
 from __future__ import annotations
 import re
 import sqlparse
-from schema_ingestion.extractor import SchemaExtractor
+from schema_ingestion.catalog import get_schema_catalog
 from config import get_settings
 from connection import ConnectionConfig
 
@@ -13,14 +13,10 @@ class SQLValidator:
     def __init__(self, connection_config: ConnectionConfig | None = None):
         self.settings = get_settings()
         self.connection_config = connection_config
-        self._schema_tables: set[str] | None = None
 
     def _get_schema_tables(self) -> set[str]:
-        if self._schema_tables is None:
-            ext = SchemaExtractor(connection_config=self.connection_config)
-            schema = ext.extract()
-            self._schema_tables = {t.name.lower() for t in schema.tables}
-        return self._schema_tables
+        """Lower-cased table names from the shared schema catalog (extracts only on miss/TTL)."""
+        return get_schema_catalog().get(self.connection_config).table_set
 
     def validate(self, sql: str) -> tuple[bool, str]:
         """Return (is_valid, error_message). Empty error_message if valid."""